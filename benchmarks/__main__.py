@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import ExitStack
+
+import httpx
+
+from benchmarks.suite import (
+    BASELINES_DIR,
+    compare,
+    run,
+    save_baseline,
+    seed,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Seed users and todos, then drive a request mix.',
+    )
+    parser.add_argument('--mode', choices=['asgi', 'http'], default='asgi')
+    parser.add_argument(
+        '--url',
+        default='http://localhost:8000',
+        help='base URL of a running server (http mode)',
+    )
+    parser.add_argument(
+        '--database-url',
+        help='database for asgi mode; default: a fresh testcontainer',
+    )
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--todos', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', metavar='NAME', help='save as baseline')
+    parser.add_argument('--compare', metavar='NAME', help='compare baseline')
+    parser.add_argument(
+        '--max-regression',
+        type=float,
+        default=0.2,
+        help='allowed latency increase over the baseline (0.2 = 20%%)',
+    )
+    return parser.parse_args()
+
+
+async def benchmark(args, client: httpx.AsyncClient):
+    users = await seed(client, args.users, args.todos)
+    summary = await run(
+        client, users, args.requests, args.concurrency, args.seed
+    )
+    return {
+        'mode': args.mode,
+        'users': args.users,
+        'todos': args.todos,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'summary': summary,
+    }
+
+
+async def benchmark_asgi(args, database_url: str):
+    # o Settings do app é lido no import: o banco precisa vir antes
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('ALGORITHM', 'HS256')
+    os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+
+    from fastapizero.app import app, lifespan  # noqa: PLC0415
+    from fastapizero.database import engine  # noqa: PLC0415
+    from fastapizero.models import table_registry  # noqa: PLC0415
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    async with (
+        lifespan(app),
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app), base_url='http://bench'
+        ) as client,
+    ):
+        return await benchmark(args, client)
+
+
+async def benchmark_http(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        return await benchmark(args, client)
+
+
+def print_report(report: dict):
+    print(
+        f'{"operation":<16}{"requests":>9}{"errors":>7}{"req/s":>9}'
+        f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+    )
+    for operation, row in report['summary'].items():
+        print(
+            f'{operation:<16}{row["requests"]:>9}{row["errors"]:>7}'
+            f'{row["throughput"]:>9.1f}{row["p50_ms"]:>9.2f}'
+            f'{row["p95_ms"]:>9.2f}{row["p99_ms"]:>9.2f}'
+        )
+
+
+def main():
+    args = parse_args()
+
+    with ExitStack() as stack:
+        if args.mode == 'http':
+            report = asyncio.run(benchmark_http(args))
+        else:
+            database_url = args.database_url
+            if not database_url:
+                from testcontainers.postgres import (  # noqa: PLC0415
+                    PostgresContainer,
+                )
+
+                postgres = stack.enter_context(
+                    PostgresContainer('postgres:16', driver='psycopg')
+                )
+                database_url = postgres.get_connection_url()
+            report = asyncio.run(benchmark_asgi(args, database_url))
+
+    print_report(report)
+
+    if args.save:
+        print(f'baseline saved to {save_baseline(args.save, report)}')
+
+    if args.compare:
+        baseline = json.loads(
+            (BASELINES_DIR / f'{args.compare}.json').read_text()
+        )
+        regressions = compare(report, baseline, args.max_regression)
+        for operation, metric, change in regressions:
+            print(f'REGRESSION {operation} {metric}: +{change:.0%}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import timeit
+from datetime import datetime
+
+from benchmarks.suite import todo_payload
+
+
+def build_todos(n_items: int):
+    # só o modelo: tests.conftest carregaria o app e o testcontainers
+    from fastapizero.models import Todo, TodoState  # noqa: PLC0415
+
+    now = datetime.now()
+    todos = []
+    for n in range(1, n_items + 1):
+        payload = todo_payload()
+        todo = Todo(
+            title=payload['title'],
+            description=payload['description'],
+            state=TodoState(payload['state']),
+            user_id=1,
+        )
+        todo.id, todo.created_at, todo.updated_at = n, now, now
+        todos.append(todo)
+    return todos
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.serialization',
+        description='Per-item cost of rendering a TodoList response.',
+    )
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    # o Settings é lido no import; nada aqui toca o banco
+    os.environ.setdefault('DATABASE_URL', 'postgresql+psycopg://bench@/bench')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('ALGORITHM', 'HS256')
+    os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+
+    from fastapi.responses import JSONResponse  # noqa: PLC0415
+    from pydantic import TypeAdapter  # noqa: PLC0415
+
+    from fastapizero.schemas import TodoList, TodoPublic  # noqa: PLC0415
+    from fastapizero.serialization import FastJSONResponse  # noqa: PLC0415
+
+    todos = build_todos(args.items)
+    rows = [
+        {name: getattr(todo, name) for name in TodoPublic.model_fields}
+        for todo in todos
+    ]
+    # o que o FastAPI faz com response_model: valida e serializa
+    adapter = TypeAdapter(TodoList)
+
+    def response_model_path(items):
+        content = adapter.dump_python(
+            adapter.validate_python({'todos': items}, from_attributes=True),
+            mode='json',
+        )
+        return JSONResponse(content).body
+
+    cases = {
+        'orm objects + response_model': lambda: response_model_path(todos),
+        'row dicts + response_model': lambda: response_model_path(rows),
+        'row dicts + FastJSONResponse': lambda: (
+            FastJSONResponse({'todos': rows, 'next_cursor': None}).body
+        ),
+    }
+
+    # mesmo documento, bytes podem diferir (ex.: escape de unicode)
+    bodies = [json.loads(case()) for case in cases.values()]
+    assert all(body == bodies[0] for body in bodies)
+
+    print(f'{"path":<32}{"µs/item":>10}{"ms/response":>14}')
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        print(
+            f'{name:<32}{best / args.items * 1e6:>10.2f}{best * 1000:>14.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from pathlib import Path
+
+import httpx
+from faker import Faker
+
+BASELINES_DIR = Path(__file__).parent / 'baselines'
+
+# operação -> peso no mix; leituras dominam como nos dashboards
+MIX = {
+    'login': 5,
+    'list': 35,
+    'list_filtered': 15,
+    'list_next_page': 10,
+    'read_user': 5,
+    'create': 15,
+    'patch': 10,
+    'delete': 5,
+}
+
+
+# sem tests.conftest: ele importa o app, e o --mode http não deve exigir
+# os segredos do servidor
+fake = Faker()
+TODO_STATES = ('Draft', 'Todo', 'Doing', 'Done', 'Trash')
+
+
+def todo_payload():
+    return {
+        'title': fake.text(),
+        'description': fake.text(),
+        'state': random.choice(TODO_STATES),
+    }
+
+
+@dataclass
+class SeededUser:
+    id: int
+    email: str
+    password: str
+    token: str
+    todo_ids: list[int] = field(default_factory=list)
+
+
+@dataclass
+class Results:
+    latencies: dict = field(default_factory=lambda: defaultdict(list))
+    errors: dict = field(default_factory=lambda: defaultdict(int))
+    elapsed: float = 0.0
+
+    def record(self, operation: str, seconds: float, ok: bool):
+        self.latencies[operation].append(seconds)
+        if not ok:
+            self.errors[operation] += 1
+
+    def summary(self):
+        def describe(samples, errors):
+            cuts = statistics.quantiles(samples, n=100, method='inclusive')
+            return {
+                'requests': len(samples),
+                'errors': errors,
+                'throughput': len(samples) / self.elapsed,
+                'p50_ms': cuts[49] * 1000,
+                'p95_ms': cuts[94] * 1000,
+                'p99_ms': cuts[98] * 1000,
+            }
+
+        everything = [
+            s for samples in self.latencies.values() for s in samples
+        ]
+        return {
+            'total': describe(everything, sum(self.errors.values())),
+            **{
+                operation: describe(samples, self.errors[operation])
+                for operation, samples in sorted(self.latencies.items())
+                if len(samples) > 1
+            },
+        }
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str):
+    response = await client.post(
+        '/auth/token', data={'username': email, 'password': password}
+    )
+    return response.json()['access_token']
+
+
+async def seed(client: httpx.AsyncClient, n_users: int, n_todos: int):
+    # execuções repetidas contra o mesmo servidor não colidem
+    tag = uuid.uuid4().hex[:8]
+    users = []
+    for n in range(n_users):
+        username = f'bench_{tag}_{n}'
+        email, password = f'{username}@email.com', f'senha_{username}'
+        response = await client.post(
+            '/users/',
+            json={'username': username, 'email': email, 'password': password},
+        )
+        response.raise_for_status()
+        token = await login(client, email, password)
+        seeded = SeededUser(response.json()['id'], email, password, token)
+
+        for start in range(0, n_todos, 1000):
+            response = await client.post(
+                '/todos/bulk',
+                headers={'Authorization': f'Bearer {token}'},
+                json=[
+                    todo_payload() for _ in range(min(1000, n_todos - start))
+                ],
+            )
+            response.raise_for_status()
+            seeded.todo_ids += [
+                todo['id'] for todo in response.json()['todos']
+            ]
+
+        users.append(seeded)
+
+    return users
+
+
+async def run_operation(
+    client: httpx.AsyncClient, rng: random.Random, operation, user
+):
+    headers = {'Authorization': f'Bearer {user.token}'}
+
+    match operation:
+        case 'login':
+            response = await client.post(
+                '/auth/token',
+                data={'username': user.email, 'password': user.password},
+            )
+        case 'list':
+            response = await client.get('/todos/', headers=headers)
+        case 'list_filtered':
+            state = rng.choice(['Draft', 'Todo', 'Doing', 'Done', 'Trash'])
+            response = await client.get(
+                f'/todos/?state={state}&limit=20', headers=headers
+            )
+        case 'list_next_page':
+            response = await client.get('/todos/?limit=20', headers=headers)
+            cursor = response.json().get('next_cursor')
+            if cursor:
+                response = await client.get(
+                    f'/todos/?limit=20&cursor={cursor}', headers=headers
+                )
+        case 'read_user':
+            response = await client.get(f'/users/{user.id}')
+        case 'create':
+            response = await client.post(
+                '/todos/',
+                headers=headers,
+                json={
+                    'title': 'bench',
+                    'description': 'bench',
+                    'state': 'Todo',
+                },
+            )
+            if response.status_code == HTTPStatus.OK:
+                user.todo_ids.append(response.json()['id'])
+        case 'patch':
+            if not user.todo_ids:
+                return None
+            response = await client.patch(
+                f'/todos/{rng.choice(user.todo_ids)}',
+                headers=headers,
+                json={'state': rng.choice(['Todo', 'Doing', 'Done'])},
+            )
+        case 'delete':
+            if not user.todo_ids:
+                return None
+            todo_id = user.todo_ids.pop(rng.randrange(len(user.todo_ids)))
+            response = await client.delete(
+                f'/todos/{todo_id}', headers=headers
+            )
+
+    return response.status_code < HTTPStatus.BAD_REQUEST
+
+
+async def run(
+    client: httpx.AsyncClient,
+    users: list[SeededUser],
+    n_requests: int,
+    concurrency: int,
+    random_seed: int = 0,
+):
+    results = Results()
+    operations = list(MIX)
+    weights = list(MIX.values())
+    remaining = iter(range(n_requests))
+
+    async def worker(worker_id: int):
+        rng = random.Random(random_seed + worker_id)
+        for _ in remaining:
+            operation = rng.choices(operations, weights)[0]
+            user = rng.choice(users)
+            started = time.perf_counter()
+            ok = await run_operation(client, rng, operation, user)
+            if ok is not None:
+                results.record(operation, time.perf_counter() - started, ok)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    results.elapsed = time.perf_counter() - started
+
+    return results.summary()
+
+
+def save_baseline(name: str, report: dict):
+    BASELINES_DIR.mkdir(exist_ok=True)
+    path = BASELINES_DIR / f'{name}.json'
+    path.write_text(json.dumps(report, indent=2) + '\n')
+    return path
+
+
+def compare(report: dict, baseline: dict, max_regression: float):
+    regressions = []
+    for operation, current in report['summary'].items():
+        previous = baseline['summary'].get(operation)
+        if not previous:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            change = current[metric] / previous[metric] - 1
+            if change > max_regression:
+                regressions.append((operation, metric, change))
+
+    return regressions
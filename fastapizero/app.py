@@ -1,16 +1,94 @@
+import time
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
-from fastapizero.routers import auth, todo, users
+from fastapizero.batching import todo_batcher
+from fastapizero.database import dispose_engines
+from fastapizero.events import todo_events
+from fastapizero.idempotency import idempotency_store, is_idempotent
+from fastapizero.metrics import new_request_stats, observe_request
+from fastapizero.profiling import log_slow_request, profiler
+from fastapizero.routers import admin, auth, todo, users
 from fastapizero.schemas import Message
+from fastapizero.security import hashing_pool
+from fastapizero.serialization import FastJSONResponse
+from fastapizero.settings import Settings
 
-app = FastAPI()
+settings = Settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await todo_batcher.close()
+    await todo_events.close()
+    hashing_pool.shutdown()
+    await dispose_engines()
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=(
+        FastJSONResponse if settings.FAST_JSON else JSONResponse
+    ),
+)
+app.include_router(admin.router)
 app.include_router(auth.router)
 app.include_router(todo.router)
 app.include_router(users.router)
 
 
+@app.middleware('http')
+async def idempotent_request(request: Request, call_next):
+    if not is_idempotent(request):
+        return await call_next(request)
+
+    return await idempotency_store.run(request, call_next)
+
+
+@app.middleware('http')
+async def record_request_metrics(request: Request, call_next):
+    stats = new_request_stats()
+    started = time.perf_counter()
+    status = HTTPStatus.INTERNAL_SERVER_ERROR
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        # o template da rota evita um label por id
+        route = request.scope.get('route')
+        observe_request(
+            request.method,
+            route.path if route else 'unmatched',
+            status,
+            elapsed,
+            stats,
+        )
+        if settings.SLOW_REQUEST_SECONDS and (
+            elapsed >= settings.SLOW_REQUEST_SECONDS
+        ):
+            log_slow_request(request, status, elapsed, stats)
+
+
+@app.middleware('http')
+async def profile_request(request: Request, call_next):
+    if not profiler.should_profile(request):
+        return await call_next(request)
+
+    return await profiler.run(request, call_next)
+
+
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
 def read_root():
     return {'message': 'Olá, mundo!'}
+
+
+@app.get('/metrics', include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
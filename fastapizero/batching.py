@@ -0,0 +1,94 @@
+import asyncio
+from collections import defaultdict
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from fastapizero.metrics import TODO_INSERT_BATCH_SIZE
+from fastapizero.models import Todo
+from fastapizero.settings import Settings
+
+settings = Settings()
+
+
+async def _insert_todos(engine: AsyncEngine, batch):
+    TODO_INSERT_BATCH_SIZE.observe(len(batch))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        todos = await session.scalars(
+            insert(Todo).returning(Todo, sort_by_parameter_order=True),
+            [values for values, _ in batch],
+        )
+        todos = todos.all()
+        await session.commit()
+
+    return todos
+
+
+class TodoInsertBatcher:
+    # group commit por processo: um INSERT e um fsync para até max_size
+    # todos que chegaram dentro de max_delay segundos
+    def __init__(self, enabled: bool, max_delay: float, max_size: int):
+        self.enabled = enabled
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self._pending = defaultdict(list)
+        self._timers = {}
+        self._flushes = set()
+
+    async def insert(self, engine: AsyncEngine, values: dict):
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending[engine]
+        pending.append((values, future))
+
+        if len(pending) >= self.max_size:
+            self._start_flush(engine)
+        elif engine not in self._timers:
+            self._timers[engine] = asyncio.get_running_loop().call_later(
+                self.max_delay, self._start_flush, engine
+            )
+
+        # cancelar a requisição não desfaz a linha já enfileirada
+        return await asyncio.shield(future)
+
+    def _start_flush(self, engine: AsyncEngine):
+        timer = self._timers.pop(engine, None)
+        if timer:
+            timer.cancel()
+
+        # em ordem de user_id: o trigger de versão trava todo_counters na
+        # ordem das linhas, e lotes concorrentes não podem se cruzar
+        batch = sorted(
+            self._pending.pop(engine, []),
+            key=lambda item: item[0]['user_id'],
+        )
+        if batch:
+            flush = asyncio.create_task(self._flush(engine, batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, engine: AsyncEngine, batch):
+        try:
+            todos = await _insert_todos(engine, batch)
+        except Exception as exc:
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            # uma linha ruim (usuário removido no meio) não derruba o lote
+            for item in batch:
+                await self._flush(engine, [item])
+            return
+
+        for (_, future), todo in zip(batch, todos):
+            future.set_result(todo)
+
+    async def close(self):
+        for engine in list(self._pending):
+            self._start_flush(engine)
+        await asyncio.gather(*self._flushes)
+
+
+todo_batcher = TodoInsertBatcher(
+    settings.TODO_BATCH_ENABLED,
+    settings.TODO_BATCH_MAX_DELAY_MS / 1000,
+    settings.TODO_BATCH_MAX_SIZE,
+)
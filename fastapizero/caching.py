@@ -0,0 +1,43 @@
+import hashlib
+from datetime import UTC, datetime
+from email.utils import format_datetime
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(
+        ':'.join(str(part) for part in parts).encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str):
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+
+    # comparação fraca: W/"x" e "x" são equivalentes
+    candidates = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return '*' in candidates or etag.removeprefix('W/') in candidates
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: datetime | None = None,
+):
+    headers = {'ETag': etag}
+    if last_modified:
+        headers['Last-Modified'] = format_datetime(
+            last_modified.replace(tzinfo=UTC), usegmt=True
+        )
+
+    if etag_matches(request, etag):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -1,11 +1,188 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+import itertools
+import time
+import zlib
+from contextlib import asynccontextmanager
 
-from fastapizero.settings import Settings
+from fastapi import Request, Response
+from prometheus_client import REGISTRY
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-engine = create_engine(Settings().DATABASE_URL)
+from fastapizero.metrics import (
+    DB_POOL_TIMEOUTS,
+    DB_POOL_WAIT_SECONDS,
+    PoolCollector,
+)
+from fastapizero.settings import Settings, split_urls
 
+settings = Settings()
 
-def get_session():  # pragma: no cover
-    with Session(engine) as session:
+READ_METHODS = {'GET', 'HEAD'}
+STICKY_COOKIE = 'fastapizero_primary'
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+class ReplicaSet:
+    def __init__(self, engines: list, retry_after: float):
+        self.engines = engines
+        self.retry_after = retry_after
+        self._counter = itertools.count()
+        self._down_until = {}
+
+    def candidates(self):
+        # round-robin, pulando réplicas que falharam há pouco
+        if not self.engines:
+            return []
+
+        now = time.monotonic()
+        start = next(self._counter) % len(self.engines)
+        ordered = self.engines[start:] + self.engines[:start]
+        return [
+            engine
+            for engine in ordered
+            if self._down_until.get(id(engine), 0) <= now
+        ]
+
+    def mark_down(self, engine):
+        self._down_until[id(engine)] = time.monotonic() + self.retry_after
+
+
+class ShardMap:
+    def __init__(self, engines: list):
+        self.engines = engines
+
+    def pick(self, key: str):
+        # posição inicial por hash; a posição real fica em users.shard
+        return zlib.crc32(key.encode()) % len(self.engines)
+
+
+def build_engine(url: str):
+    connect_args = {}
+    if settings.DATABASE_CONNECT_TIMEOUT:
+        # réplica que descarta pacotes: falha rápido no connect e no pre-ping
+        # em vez de segurar a requisição até o timeout do TCP
+        connect_args['connect_timeout'] = settings.DATABASE_CONNECT_TIMEOUT
+        connect_args['tcp_user_timeout'] = (
+            settings.DATABASE_CONNECT_TIMEOUT * 1000
+        )
+    if settings.DATABASE_STATEMENT_TIMEOUT_MS:
+        connect_args['options'] = (
+            f'-c statement_timeout={settings.DATABASE_STATEMENT_TIMEOUT_MS}'
+        )
+
+    return create_async_engine(
+        url,
+        poolclass=MeteredPool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+engine = build_engine(settings.DATABASE_URL)
+replicas = ReplicaSet(
+    [build_engine(url) for url in split_urls(settings.DATABASE_REPLICA_URLS)],
+    settings.DATABASE_REPLICA_RETRY_SECONDS,
+)
+shards = ShardMap([
+    engine,
+    *(build_engine(url) for url in split_urls(settings.DATABASE_SHARD_URLS)),
+])
+REGISTRY.register(
+    PoolCollector({
+        'primary': engine,
+        **{
+            f'replica-{index}': replica
+            for index, replica in enumerate(replicas.engines)
+        },
+        **{
+            f'shard-{index}': shard
+            for index, shard in enumerate(shards.engines)
+            if index
+        },
+    })
+)
+
+
+async def _replica_session():
+    for replica in replicas.candidates():
+        session = AsyncSession(replica, expire_on_commit=False)
+        try:
+            # checkout com pre-ping serve de health check
+            await session.connection()
+        except OperationalError:
+            await session.close()
+            replicas.mark_down(replica)
+            continue
+        except PoolTimeoutError:
+            # réplica saturada, não fora do ar: tenta a próxima ou o primário
+            await session.close()
+            continue
+        return session
+
+    return None
+
+
+async def get_session(request: Request, response: Response):
+    session = None
+    if request.method in READ_METHODS:
+        # leituras logo após uma escrita do mesmo cliente ficam no primário
+        if STICKY_COOKIE not in request.cookies:
+            session = await _replica_session()
+    elif replicas.engines:
+        response.set_cookie(
+            STICKY_COOKIE,
+            '1',
+            max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+            httponly=True,
+        )
+
+    if session is None:
+        session = AsyncSession(engine, expire_on_commit=False)
+
+    async with session:
         yield session
+
+
+@asynccontextmanager
+async def session_for_shard(session: AsyncSession, shard: int):
+    # o shard 0 é o banco principal: reaproveita a sessão da requisição
+    if shard == 0:
+        yield session
+        return
+
+    async with AsyncSession(
+        shards.engines[shard], expire_on_commit=False
+    ) as shard_session:
+        yield shard_session
+
+
+async def execute_on_shard(shard: int, statement):
+    # espelho de users no shard, para as FKs e o cascade de todos
+    if shard == 0:
+        return
+
+    async with AsyncSession(shards.engines[shard]) as session:
+        await session.execute(statement)
+        await session.commit()
+
+
+async def dispose_engines():
+    for database in (*shards.engines, *replicas.engines):
+        await database.dispose()
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager, suppress
+
+import psycopg
+from sqlalchemy.engine import make_url
+
+from fastapizero.database import shards
+
+logger = logging.getLogger(__name__)
+
+
+def render_sse(event: dict):
+    return f'event: {event["event"]}\ndata: {json.dumps(event)}\n\n'
+
+
+class TodoEventBroker:
+    reconnect_delay = 1
+    ready_timeout = 5
+
+    # um LISTEN por shard: o NOTIFY sai dos triggers do banco que recebeu a
+    # escrita (ver TODO_EVENTS_FUNCTION)
+    def __init__(self, urls: list, channel='todo_events', queue_size=100):
+        self.conninfos = [
+            make_url(url)
+            .set(drivername='postgresql')
+            .render_as_string(hide_password=False)
+            for url in urls
+        ]
+        self.channel = channel
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._listeners = []
+        self._ready = [asyncio.Event() for _ in urls]
+
+    def _start(self):
+        if not self._listeners:
+            self._listeners = [
+                asyncio.create_task(self._listen(conninfo, ready))
+                for conninfo, ready in zip(self.conninfos, self._ready)
+            ]
+
+    async def wait_ready(self, shard: int):
+        self._start()
+        # só o LISTEN do shard do usuário: outro shard fora do ar não trava
+        await asyncio.wait_for(self._ready[shard].wait(), self.ready_timeout)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int, shard: int = 0):
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers[user_id].add(queue)
+        try:
+            await self.wait_ready(shard)
+            yield queue
+        finally:
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def _dispatch(self, event: dict, user_ids=None):
+        for user_id in user_ids or [event['user_id']]:
+            for queue in self._subscribers.get(user_id, ()):
+                # cliente lento: descarta o evento mais antigo
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def _listen_once(
+        self, conninfo: str, ready: asyncio.Event, reconnected: bool
+    ):
+        async with await psycopg.AsyncConnection.connect(
+            conninfo, autocommit=True
+        ) as connection:
+            await connection.execute(f'LISTEN {self.channel}')
+            ready.set()
+            if reconnected:
+                # eventos perdidos durante a queda
+                self._dispatch(
+                    {'event': 'resync', 'ids': None}, list(self._subscribers)
+                )
+
+            async for notify in connection.notifies():
+                self._dispatch(json.loads(notify.payload))
+
+    async def _listen(self, conninfo: str, ready: asyncio.Event):
+        reconnected = False
+        while True:
+            try:
+                await self._listen_once(conninfo, ready, reconnected)
+            except Exception:
+                # payload inválido ou queda: reconecta e manda ressincronizar
+                logger.exception('todo events listener failed')
+                reconnected = True
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def close(self):
+        for listener in self._listeners:
+            listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await listener
+
+        self._listeners = []
+        for ready in self._ready:
+            ready.clear()
+
+
+todo_events = TodoEventBroker([shard.url for shard in shards.engines])
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from http import HTTPStatus
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from fastapizero import database
+from fastapizero.models import IdempotencyKey
+from fastapizero.security import token_subject
+from fastapizero.settings import Settings
+
+settings = Settings()
+
+IDEMPOTENCY_HEADER = 'idempotency-key'
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+IDEMPOTENT_ROUTES = {('POST', '/todos/'), ('POST', '/users/')}
+POLL_SECONDS = 0.05
+PURGE_INTERVAL_SECONDS = 60
+
+
+def is_idempotent(request: Request):
+    if IDEMPOTENCY_HEADER not in request.headers or (
+        (request.method, request.url.path) not in IDEMPOTENT_ROUTES
+    ):
+        return False
+
+    # token inválido ou vencido: a rota responde 401 sem efeito, e o escopo
+    # anônimo ('') fica só para quem não manda token
+    authorization = request.headers.get('authorization')
+    return not authorization or token_subject(authorization) is not None
+
+
+def request_fingerprint(method: str, path: str, body: bytes):
+    return hashlib.sha256(
+        b'\n'.join([method.encode(), path.encode(), body])
+    ).hexdigest()
+
+
+def _error(status: HTTPStatus, detail: str, headers=None):
+    return JSONResponse({'detail': detail}, status, headers=headers)
+
+
+class IdempotencyStore:
+    # A tabela é a fonte da verdade entre processos; o cache na frente evita
+    # ir ao banco em retries para o mesmo worker. A gravação da resposta não
+    # é atômica com a do handler: se o processo cair entre as duas, o retry
+    # executa de novo depois de lock_seconds.
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        ttl: int,
+        lock_seconds: int,
+        wait_seconds: float,
+        cache_size: int,
+    ):
+        self.engine = engine
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._last_purge = 0.0
+
+    def _cached(self, scope):
+        entry = self._cache.get(scope)
+        if entry is None or entry['expires'] <= time.monotonic():
+            self._cache.pop(scope, None)
+            return None
+
+        self._cache.move_to_end(scope)
+        return entry
+
+    def _remember(self, scope, entry: dict, ttl: float):
+        self._cache[scope] = {**entry, 'expires': time.monotonic() + ttl}
+        self._cache.move_to_end(scope)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _replay(entry: dict, fingerprint: str):
+        if entry['fingerprint'] != fingerprint:
+            return _error(
+                HTTPStatus.UNPROCESSABLE_ENTITY,
+                'Idempotency-Key reused with a different request!',
+            )
+
+        return Response(
+            entry['body'],
+            status_code=entry['status_code'],
+            media_type=entry['media_type'],
+            headers={'Idempotent-Replayed': 'true'},
+        )
+
+    async def _claim(self, scope, fingerprint: str):
+        subject, key = scope
+        now = func.now()
+        async with AsyncSession(self.engine) as session:
+            claim = pg_insert(IdempotencyKey).values(
+                subject=subject,
+                key=key,
+                fingerprint=fingerprint,
+                locked_until=now + timedelta(seconds=self.lock_seconds),
+                expires_at=now + timedelta(seconds=self.ttl),
+            )
+            claim = claim.on_conflict_do_update(
+                index_elements=[IdempotencyKey.subject, IdempotencyKey.key],
+                set_={
+                    'fingerprint': claim.excluded.fingerprint,
+                    'locked_until': claim.excluded.locked_until,
+                    'expires_at': claim.excluded.expires_at,
+                    'status_code': None,
+                    'media_type': None,
+                    'body': None,
+                },
+                # chave vencida ou dono que morreu no meio: assume a chave
+                where=or_(
+                    IdempotencyKey.expires_at < now,
+                    IdempotencyKey.status_code.is_(None)
+                    & (IdempotencyKey.locked_until < now),
+                ),
+            ).returning(IdempotencyKey.key)
+
+            while True:
+                # None: a chave é desta requisição, que deve executar o handler
+                if await session.scalar(claim) is not None:
+                    await self._purge(session)
+                    await session.commit()
+                    return None
+
+                row = await session.execute(
+                    select(
+                        IdempotencyKey.fingerprint,
+                        IdempotencyKey.status_code,
+                        IdempotencyKey.media_type,
+                        IdempotencyKey.body,
+                        func.extract(
+                            'epoch', IdempotencyKey.expires_at - now
+                        ).label('remaining'),
+                    ).where(
+                        IdempotencyKey.subject == subject,
+                        IdempotencyKey.key == key,
+                    )
+                )
+                row = row.mappings().first()
+                # liberada ou purgada entre o upsert e o SELECT: tenta de novo
+                if row is not None:
+                    return row
+
+    async def _purge(self, session: AsyncSession):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+
+        self._last_purge = time.monotonic()
+        await session.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.expires_at < func.now()
+            )
+        )
+
+    async def _finish(self, scope, entry: dict | None):
+        subject, key = scope
+        criteria = (
+            IdempotencyKey.subject == subject,
+            IdempotencyKey.key == key,
+        )
+        async with AsyncSession(self.engine) as session:
+            if entry is None:
+                # erro do servidor: libera a chave para o retry executar
+                await session.execute(delete(IdempotencyKey).where(*criteria))
+            else:
+                await session.execute(
+                    update(IdempotencyKey)
+                    .where(*criteria)
+                    .values(
+                        status_code=entry['status_code'],
+                        media_type=entry['media_type'],
+                        body=entry['body'],
+                    )
+                )
+            await session.commit()
+
+        if entry is not None:
+            self._remember(scope, entry, self.ttl)
+
+    async def _execute(self, scope, fingerprint: str, request, call_next):
+        entry = None
+        try:
+            response = await call_next(request)
+            body = b''.join([chunk async for chunk in response.body_iterator])
+            if response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR:
+                entry = {
+                    'fingerprint': fingerprint,
+                    'status_code': response.status_code,
+                    'media_type': response.headers.get('content-type'),
+                    'body': body,
+                }
+        finally:
+            await self._finish(scope, entry)
+
+        return Response(
+            body, status_code=response.status_code, headers=response.headers
+        )
+
+    async def run(self, request: Request, call_next):
+        key = request.headers[IDEMPOTENCY_HEADER]
+        if not key or len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+            return _error(HTTPStatus.BAD_REQUEST, 'Invalid Idempotency-Key!')
+
+        scope = (
+            token_subject(request.headers.get('authorization')) or '',
+            key,
+        )
+        fingerprint = request_fingerprint(
+            request.method, request.url.path, await request.body()
+        )
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+            entry = self._cached(scope)
+            if entry:
+                return self._replay(entry, fingerprint)
+
+            remaining = deadline - time.monotonic()
+            # duplicata no mesmo worker: espera a primeira sem ir ao banco
+            if scope in self._inflight:
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(self._inflight[scope]), remaining
+                    )
+                except TimeoutError:
+                    break
+                continue
+
+            inflight = asyncio.get_running_loop().create_future()
+            self._inflight[scope] = inflight
+            try:
+                row = await self._claim(scope, fingerprint)
+                if row is None:
+                    return await self._execute(
+                        scope, fingerprint, request, call_next
+                    )
+            finally:
+                del self._inflight[scope]
+                inflight.set_result(None)
+
+            if row['status_code'] is not None:
+                self._remember(scope, row, float(row['remaining']))
+                return self._replay(row, fingerprint)
+            if row['fingerprint'] != fingerprint:
+                return self._replay(row, fingerprint)
+
+            # outro worker está executando: consulta de novo até o prazo
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(POLL_SECONDS, remaining))
+
+        return _error(
+            HTTPStatus.CONFLICT,
+            'A request with this Idempotency-Key is still in progress!',
+            headers={'Retry-After': '1'},
+        )
+
+
+idempotency_store = IdempotencyStore(
+    database.engine,
+    settings.IDEMPOTENCY_TTL_SECONDS,
+    settings.IDEMPOTENCY_LOCK_SECONDS,
+    settings.IDEMPOTENCY_WAIT_SECONDS,
+    settings.IDEMPOTENCY_CACHE_SIZE,
+)
@@ -0,0 +1,165 @@
+import time
+from contextvars import ContextVar
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+ROUTE_LABELS = ['method', 'route']
+REQUEST_MAX_STATEMENTS = 100
+
+HTTP_REQUESTS = Counter(
+    'http_requests',
+    'Requests handled, by route and status code.',
+    [*ROUTE_LABELS, 'status'],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_seconds',
+    'Request latency until the response starts.',
+    ROUTE_LABELS,
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds',
+    'Time spent executing SQL statements per request.',
+    ROUTE_LABELS,
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_DB_STATEMENTS = Histogram(
+    'http_request_db_statements',
+    'SQL statements executed per request.',
+    ROUTE_LABELS,
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100),
+)
+HTTP_REQUEST_HASHING_SECONDS = Histogram(
+    'http_request_hashing_seconds',
+    'Time spent waiting on argon2 hashing per request.',
+    ROUTE_LABELS,
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASHING_SECONDS = Histogram(
+    'password_hashing_seconds',
+    'Argon2 hash and verify time, including time queued for a worker.',
+    ['operation'],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    'db_pool_wait_seconds',
+    'Time spent acquiring a connection from the pool.',
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_TIMEOUTS = Counter(
+    'db_pool_timeouts',
+    'Connection checkouts that gave up after the pool timeout.',
+)
+
+TODO_INSERT_BATCH_SIZE = Histogram(
+    'todo_insert_batch_size',
+    'Todos written per group-commit INSERT.',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+
+
+# acumuladores da requisição corrente, preenchidos pelo middleware do app
+request_stats: ContextVar[dict | None] = ContextVar(
+    'request_stats', default=None
+)
+
+
+def new_request_stats():
+    stats = {
+        'db_seconds': 0.0,
+        'db_statements': 0,
+        'hashing_seconds': 0.0,
+        'statements': [],  # para o log de requisições lentas
+    }
+    request_stats.set(stats)
+    return stats
+
+
+def observe_request(method: str, route: str, status: int, elapsed, stats):
+    HTTP_REQUESTS.labels(method, route, status).inc()
+    HTTP_REQUEST_SECONDS.labels(method, route).observe(elapsed)
+    HTTP_REQUEST_DB_SECONDS.labels(method, route).observe(stats['db_seconds'])
+    HTTP_REQUEST_DB_STATEMENTS.labels(method, route).observe(
+        stats['db_statements']
+    )
+    HTTP_REQUEST_HASHING_SECONDS.labels(method, route).observe(
+        stats['hashing_seconds']
+    )
+
+
+def observe_hashing(operation: str, elapsed):
+    PASSWORD_HASHING_SECONDS.labels(operation).observe(elapsed)
+    stats = request_stats.get()
+    if stats is not None:
+        stats['hashing_seconds'] += elapsed
+
+
+@event.listens_for(Engine, 'before_cursor_execute', named=True)
+def _before_cursor_execute(conn, **kwargs):
+    conn.info['statement_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute', named=True)
+def _after_cursor_execute(conn, statement, **kwargs):
+    elapsed = time.perf_counter() - conn.info.pop('statement_started')
+    stats = request_stats.get()
+    if stats is not None:
+        stats['db_seconds'] += elapsed
+        stats['db_statements'] += 1
+        if len(stats['statements']) < REQUEST_MAX_STATEMENTS:
+            stats['statements'].append((statement, elapsed))
+
+
+class PoolCollector(Collector):
+    def __init__(self, engines: dict):
+        self.engines = engines
+
+    def collect(self):
+        gauges = {
+            'size': GaugeMetricFamily(
+                'db_pool_size', 'Configured pool size.', labels=['database']
+            ),
+            'checkedout': GaugeMetricFamily(
+                'db_pool_checked_out',
+                'Connections currently checked out of the pool.',
+                labels=['database'],
+            ),
+            'checkedin': GaugeMetricFamily(
+                'db_pool_checked_in',
+                'Idle connections held by the pool.',
+                labels=['database'],
+            ),
+            'overflow': GaugeMetricFamily(
+                'db_pool_overflow',
+                'Connections opened beyond the pool size.',
+                labels=['database'],
+            ),
+        }
+
+        for name, engine in self.engines.items():
+            pool = engine.sync_engine.pool
+            for attribute, gauge in gauges.items():
+                value = getattr(pool, attribute)()
+                # QueuePool.overflow() é negativo enquanto há folga no pool
+                gauge.add_metric([name], max(value, 0))
+
+        yield from gauges.values()
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import DDL, BigInteger, ForeignKey, Index, event, func
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
@@ -23,11 +23,15 @@ class User:
     username: Mapped[str] = mapped_column(unique=True)
     password: Mapped[str]
     email: Mapped[str] = mapped_column(unique=True)
+    shard: Mapped[int] = mapped_column(default=0, server_default='0')
+    # escritas em todos recusadas neste banco (ver TODO_CHANGES_FUNCTION)
+    frozen: Mapped[bool] = mapped_column(default=False, server_default='false')
 
     todos: Mapped[list['Todo']] = relationship(
         init=False,
         back_populates='user',
         cascade='all, delete-orphan',
+        passive_deletes=True,
     )
 
     created_at: Mapped[datetime] = mapped_column(
@@ -45,13 +49,34 @@ class User:
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        Index('ix_todos_user_id_id', 'user_id', 'id'),
+        Index('ix_todos_user_id_state', 'user_id', 'state'),
+        Index('ix_todos_user_id_updated_at', 'user_id', 'updated_at'),
+        Index('ix_todos_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_todos_user_id_version', 'user_id', 'version'),
+        Index(
+            'ix_todos_title_trgm',
+            'title',
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+        ),
+        Index(
+            'ix_todos_description_trgm',
+            'description',
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
     description: Mapped[str]
     state: Mapped[TodoState]
 
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
 
     user: Mapped[User] = relationship(init=False, back_populates='todos')
 
@@ -65,3 +90,272 @@ class Todo:
         server_default=func.now(),
         onupdate=func.now(),
     )
+
+    # carimbada pelo trigger todo_changes_stamp
+    version: Mapped[int] = mapped_column(
+        BigInteger, init=False, server_default='0'
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoDeletion:
+    __tablename__ = 'todo_deletions'
+    __table_args__ = (
+        Index('ix_todo_deletions_user_id_version', 'user_id', 'version'),
+        Index('ix_todo_deletions_deleted_at', 'deleted_at'),
+    )
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    todo_id: Mapped[int]
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False,
+        server_default=func.now(),
+    )
+    version: Mapped[int] = mapped_column(
+        BigInteger, init=False, server_default='0'
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    __tablename__ = 'todo_counters'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        init=False,
+        server_default=func.now(),
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoStateCount:
+    __tablename__ = 'todo_state_counts'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+@table_registry.mapped_as_dataclass
+class IdempotencyKey:
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (Index('ix_idempotency_keys_expires_at', 'expires_at'),)
+
+    # subject: o sub do token, ou '' nas rotas sem autenticação
+    subject: Mapped[str] = mapped_column(primary_key=True)
+    key: Mapped[str] = mapped_column(primary_key=True)
+    fingerprint: Mapped[str]
+    locked_until: Mapped[datetime]
+    expires_at: Mapped[datetime]
+    # NULL enquanto a primeira execução não termina
+    status_code: Mapped[int | None] = mapped_column(default=None)
+    media_type: Mapped[str | None] = mapped_column(default=None)
+    body: Mapped[bytes | None] = mapped_column(default=None)
+
+
+# Uma linha por usuário, incrementada por statement (não por linha) em
+# qualquer escrita em todos: ORM, bulk, COPY e cascade. O ORDER BY fixa a
+# ordem dos locks quando um statement toca vários usuários (bulk, lotes do
+# batching), evitando deadlock entre statements concorrentes.
+TODO_COUNTERS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_counters_bump() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO todo_counters AS counter (user_id, version, updated_at)
+    SELECT changed_rows.user_id, 1, now()
+    FROM changed_rows
+    JOIN users ON users.id = changed_rows.user_id
+    GROUP BY changed_rows.user_id
+    ORDER BY changed_rows.user_id
+    ON CONFLICT (user_id) DO UPDATE
+    SET version = counter.version + 1, updated_at = now();
+    RETURN NULL;
+END
+$$
+"""
+
+TODO_COUNTERS_TRIGGERS = [
+    f"""
+    CREATE OR REPLACE TRIGGER todo_counters_{event_name.lower()}
+    AFTER {event_name} ON todos
+    REFERENCING {transition} TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_bump()
+    """
+    for event_name, transition in (
+        ('INSERT', 'NEW'),
+        ('UPDATE', 'NEW'),
+        ('DELETE', 'OLD'),
+    )
+]
+
+# Versão de sincronização do /todos/changes. updated_at e deleted_at vêm do
+# início da transação, e um commit atrasado ficaria para trás do watermark já
+# entregue. Aqui cada linha recebe a versão do usuário, incrementada uma vez
+# por transação sob o lock da linha em todo_counters, que só sai no commit:
+# versões menores ou iguais à lida no contador já estão todas commitadas.
+# O move_user congela o usuário no shard de origem (users.frozen): o FOR
+# SHARE faz o UPDATE dele esperar as transações que já escreveram, e as
+# seguintes falham com object_not_in_prerequisite_state até a purga.
+TODO_CHANGES_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_changes_stamp() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    setting text := 'todo_changes.user_' || NEW.user_id;
+    stamp bigint := nullif(current_setting(setting, true), '')::bigint;
+    is_frozen boolean;
+BEGIN
+    IF stamp IS NULL THEN
+        SELECT users.frozen INTO is_frozen
+        FROM users WHERE users.id = NEW.user_id
+        FOR SHARE;
+        IF is_frozen THEN
+            RAISE EXCEPTION USING
+                ERRCODE = 'object_not_in_prerequisite_state',
+                MESSAGE = 'todos of user ' || NEW.user_id || ' are frozen';
+        END IF;
+
+        INSERT INTO todo_counters AS counter (user_id, version, updated_at)
+        VALUES (NEW.user_id, 1, now())
+        ON CONFLICT (user_id) DO UPDATE
+        SET version = counter.version + 1, updated_at = now()
+        RETURNING counter.version INTO stamp;
+        PERFORM set_config(setting, stamp::text, true);
+    END IF;
+    NEW.version := stamp;
+    RETURN NEW;
+END
+$$
+"""
+
+TODO_CHANGES_TRIGGERS = [
+    """
+    CREATE OR REPLACE TRIGGER todo_changes_stamp
+    BEFORE INSERT OR UPDATE ON todos
+    FOR EACH ROW EXECUTE FUNCTION todo_changes_stamp()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER todo_changes_stamp
+    BEFORE INSERT ON todo_deletions
+    FOR EACH ROW EXECUTE FUNCTION todo_changes_stamp()
+    """,
+]
+
+# Contagem por estado aplicada em delta a partir das transition tables;
+# drift (triggers desligados, restore parcial) é corrigido com
+# python -m fastapizero.todo_stats.
+TODO_STATE_COUNTS_UPSERT = """
+        INSERT INTO todo_state_counts AS counts (user_id, state, count)
+        SELECT deltas.user_id, deltas.state, sum(deltas.delta)
+        FROM ({deltas}) AS deltas
+        JOIN users ON users.id = deltas.user_id
+        GROUP BY deltas.user_id, deltas.state
+        HAVING sum(deltas.delta) <> 0
+        ORDER BY deltas.user_id, deltas.state
+        ON CONFLICT (user_id, state) DO UPDATE
+        SET count = counts.count + excluded.count;
+"""
+TODO_STATE_COUNTS_NEW = 'SELECT user_id, state, 1 AS delta FROM new_rows'
+TODO_STATE_COUNTS_OLD = 'SELECT user_id, state, -1 AS delta FROM old_rows'
+TODO_STATE_COUNTS_BOTH = (
+    f'{TODO_STATE_COUNTS_OLD} UNION ALL {TODO_STATE_COUNTS_NEW}'
+)
+
+TODO_STATE_COUNTS_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION todo_state_counts_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+{TODO_STATE_COUNTS_UPSERT.format(deltas=TODO_STATE_COUNTS_NEW)}
+    ELSIF TG_OP = 'DELETE' THEN
+{TODO_STATE_COUNTS_UPSERT.format(deltas=TODO_STATE_COUNTS_OLD)}
+    ELSE
+{TODO_STATE_COUNTS_UPSERT.format(deltas=TODO_STATE_COUNTS_BOTH)}
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+TODO_STATE_COUNTS_TRIGGERS = [
+    f"""
+    CREATE OR REPLACE TRIGGER todo_state_counts_{event_name.lower()}
+    AFTER {event_name} ON todos
+    REFERENCING {transitions}
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_state_counts_apply()
+    """
+    for event_name, transitions in (
+        ('INSERT', 'NEW TABLE AS new_rows'),
+        ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+        ('DELETE', 'OLD TABLE AS old_rows'),
+    )
+]
+
+# Eventos do /todos/stream saem do próprio statement, sem custo extra nas
+# rotas e cobrindo COPY e cascade. O NOTIFY só é entregue no commit e tem
+# limite de 8000 bytes, daí os ids em lotes de 500 por usuário.
+TODO_EVENTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_events_notify() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('todo_events', payload)
+    FROM (
+        SELECT json_build_object(
+            'user_id', user_id,
+            'event', TG_ARGV[0],
+            'ids', json_agg(id ORDER BY id)
+        )::text AS payload
+        FROM (
+            SELECT user_id, id,
+                (row_number() OVER (PARTITION BY user_id ORDER BY id) - 1)
+                    / 500 AS chunk
+            FROM changed_rows
+        ) AS changed
+        GROUP BY user_id, chunk
+        ORDER BY user_id, chunk
+    ) AS notifications;
+    RETURN NULL;
+END
+$$
+"""
+
+TODO_EVENTS_TRIGGERS = [
+    f"""
+    CREATE OR REPLACE TRIGGER todo_events_{event_name.lower()}
+    AFTER {event_name} ON todos
+    REFERENCING {transition} TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_events_notify('{name}')
+    """
+    for event_name, transition, name in (
+        ('INSERT', 'NEW', 'created'),
+        ('UPDATE', 'NEW', 'updated'),
+        ('DELETE', 'OLD', 'deleted'),
+    )
+]
+
+event.listen(
+    table_registry.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'),
+)
+
+for statement in (
+    TODO_COUNTERS_FUNCTION,
+    *TODO_COUNTERS_TRIGGERS,
+    TODO_CHANGES_FUNCTION,
+    *TODO_CHANGES_TRIGGERS,
+    TODO_STATE_COUNTS_FUNCTION,
+    *TODO_STATE_COUNTS_TRIGGERS,
+    TODO_EVENTS_FUNCTION,
+    *TODO_EVENTS_TRIGGERS,
+):
+    event.listen(table_registry.metadata, 'after_create', DDL(statement))
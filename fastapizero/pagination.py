@@ -0,0 +1,26 @@
+import base64
+import json
+from datetime import datetime
+from http import HTTPStatus
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values):
+    payload = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, *parsers):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return tuple(
+            parse(value) for parse, value in zip(parsers, values, strict=True)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor!'
+        )
@@ -0,0 +1,122 @@
+import cProfile
+import io
+import itertools
+import logging
+import marshal
+import pstats
+import random
+import secrets
+import time
+from collections import deque
+from datetime import UTC, datetime
+from http import HTTPStatus
+
+from fastapi import Request
+
+from fastapizero.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+PROFILE_HEADER = 'x-profile'
+PROFILE_TOP_FUNCTIONS = 25
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        enabled: bool,
+        token: str,
+        sample_rate: float,
+        buffer_size: int,
+    ):
+        self.enabled = enabled
+        self.token = token
+        self.sample_rate = sample_rate
+        self.profiles = deque(maxlen=buffer_size)
+        self.active = False
+        self._ids = itertools.count(1)
+
+    def check_token(self, token: str | None):
+        return bool(
+            self.token
+            and token
+            and secrets.compare_digest(token.encode(), self.token.encode())
+        )
+
+    def should_profile(self, request: Request):
+        # cProfile é por thread: um perfil por vez no event loop
+        if not self.enabled or self.active:
+            return False
+        if request.url.path.startswith('/admin'):
+            return False
+        if self.check_token(request.headers.get(PROFILE_HEADER)):
+            return True
+        return random.random() < self.sample_rate
+
+    async def run(self, request: Request, call_next):
+        profile = cProfile.Profile()
+        status = HTTPStatus.INTERNAL_SERVER_ERROR
+        self.active = True
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            profile.disable()
+            self.active = False
+            profile_id = self._save(
+                request, status, time.perf_counter() - started, profile
+            )
+
+        response.headers['X-Profile-Id'] = str(profile_id)
+        return response
+
+    def _save(self, request: Request, status, elapsed, profile):
+        top = io.StringIO()
+        stats = pstats.Stats(profile, stream=top)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+
+        profile_id = next(self._ids)
+        self.profiles.append({
+            'id': profile_id,
+            'method': request.method,
+            'path': request.url.path,
+            'status': status,
+            'elapsed_seconds': elapsed,
+            'created_at': datetime.now(UTC),
+            'top': top.getvalue(),
+            # mesmo formato do pstats.dump_stats: snakeviz, flameprof
+            'data': marshal.dumps(stats.stats),
+        })
+        return profile_id
+
+    def get(self, profile_id: int):
+        return next((p for p in self.profiles if p['id'] == profile_id), None)
+
+
+def log_slow_request(request: Request, status, elapsed, stats):
+    statements = '\n'.join(
+        f'  {seconds * 1000:.1f} ms  {statement}'
+        for statement, seconds in stats['statements']
+    )
+    logger.warning(
+        'slow request %s %s -> %s in %.3fs, %d statements (%.3fs SQL)\n%s',
+        request.method,
+        request.url.path,
+        status,
+        elapsed,
+        stats['db_statements'],
+        stats['db_seconds'],
+        statements,
+    )
+
+
+profiler = RequestProfiler(
+    settings.PROFILING_ENABLED,
+    settings.PROFILING_TOKEN,
+    settings.PROFILING_SAMPLE_RATE,
+    settings.PROFILING_BUFFER_SIZE,
+)
@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapizero.database import ShardMap, dispose_engines, shards
+from fastapizero.models import Todo, TodoCounter, TodoDeletion, User
+from fastapizero.security import principal_cache
+from fastapizero.settings import Settings
+
+settings = Settings()
+
+# Roda com a aplicação no ar: o usuário fica congelado no shard de origem
+# (users.frozen, checado pelo trigger todo_changes_stamp) e escritas no meio
+# da movimentação recebem 503 em vez de se perderem. Workers com o shard
+# antigo no principal_cache continuam lendo a origem até a purga, que espera
+# o TTL do cache. As sequências dos shards se sobrepõem, então os todos
+# ganham ids novos no destino e os ids antigos viram tombstones para o
+# /todos/changes.
+
+MOVE_CHUNK_SIZE = 1000
+MOVE_PURGE_DELAY = settings.PRINCIPAL_CACHE_TTL_SECONDS
+MOVED_TABLES = (Todo.__table__, TodoDeletion.__table__)
+
+
+def _copied(rows, *skipped):
+    return [
+        {
+            key: value
+            for key, value in row._asdict().items()
+            if key not in skipped
+        }
+        for row in rows
+    ]
+
+
+async def _partitions(source: AsyncSession, table, user_id):
+    result = await source.stream(
+        select(table)
+        .where(table.c.user_id == user_id)
+        .execution_options(yield_per=MOVE_CHUNK_SIZE)
+    )
+    async for rows in result.partitions():
+        yield rows
+
+
+async def _copy_rows(source: AsyncSession, target: AsyncSession, user_id):
+    # sobras de uma execução interrompida
+    for table in MOVED_TABLES:
+        await target.execute(delete(table).where(table.c.user_id == user_id))
+
+    # contador antes das linhas: o trigger carimba as cópias acima de
+    # qualquer versão já servida no shard de origem
+    version = await source.scalar(
+        select(TodoCounter.version).where(TodoCounter.user_id == user_id)
+    )
+    upsert = pg_insert(TodoCounter).values(
+        user_id=user_id, version=(version or 0) + 1
+    )
+    await target.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[TodoCounter.user_id],
+            set_={'version': TodoCounter.version + upsert.excluded.version},
+        )
+    )
+
+    async for rows in _partitions(source, Todo.__table__, user_id):
+        await target.execute(insert(Todo), _copied(rows, 'id'))
+        await target.execute(
+            insert(TodoDeletion),
+            [{'todo_id': row.id, 'user_id': user_id} for row in rows],
+        )
+
+    async for rows in _partitions(source, TodoDeletion.__table__, user_id):
+        await target.execute(insert(TodoDeletion), _copied(rows, 'id'))
+
+    # id antigo reaproveitado no destino: a linha nova já substitui a antiga
+    # no cliente, e o tombstone poria o mesmo id em todos e em deleted
+    await target.execute(
+        delete(TodoDeletion).where(
+            TodoDeletion.user_id == user_id,
+            TodoDeletion.todo_id.in_(
+                select(Todo.id).where(Todo.user_id == user_id)
+            ),
+        )
+    )
+
+
+async def _purge_rows(source: AsyncSession, user_id, shard):
+    if shard:
+        # o espelho do usuário leva todos, tombstones e contador no cascade
+        await source.execute(delete(User).where(User.id == user_id))
+    else:
+        # o usuário segue congelado no shard 0, que é também o diretório
+        for table in (*MOVED_TABLES, TodoCounter.__table__):
+            await source.execute(
+                delete(table).where(table.c.user_id == user_id)
+            )
+
+
+async def _prepare_target(target: AsyncSession, user: User, shard):
+    if shard:
+        await target.execute(delete(User).where(User.id == user.id))
+        await target.execute(
+            insert(User).values(
+                id=user.id,
+                username=user.username,
+                email=user.email,
+                password=user.password,
+                shard=shard,
+            )
+        )
+    else:
+        # congelado desde que o usuário saiu do shard 0
+        await target.execute(
+            update(User).where(User.id == user.id).values(frozen=False)
+        )
+
+
+async def _set_frozen(engine, user_id, frozen: bool):
+    async with AsyncSession(engine) as session:
+        # espera as transações que já escreveram (FOR SHARE do trigger)
+        await session.execute(
+            update(User).where(User.id == user_id).values(frozen=frozen)
+        )
+        await session.commit()
+
+
+async def move_user(
+    shard_map: ShardMap,
+    user_id: int,
+    target_shard: int,
+    purge_delay: float = MOVE_PURGE_DELAY,
+):
+    async with AsyncSession(shard_map.engines[0]) as directory:
+        user = await directory.get(User, user_id)
+        if user is None:
+            raise ValueError(f'User {user_id} not found')
+
+        source_shard, subject = user.shard, user.email
+        if source_shard == target_shard:
+            return
+
+        await _set_frozen(shard_map.engines[source_shard], user_id, True)
+        async with (
+            AsyncSession(shard_map.engines[source_shard]) as source,
+            AsyncSession(shard_map.engines[target_shard]) as target,
+        ):
+            try:
+                await _prepare_target(target, user, target_shard)
+                await _copy_rows(source, target, user_id)
+                await target.commit()
+
+                # a partir daqui as requisições vão para o shard novo
+                user.shard = target_shard
+                await directory.commit()
+            except Exception:
+                await _set_frozen(
+                    shard_map.engines[source_shard], user_id, False
+                )
+                raise
+            principal_cache.invalidate(subject)
+
+            # workers com o shard antigo em cache ainda leem a origem
+            await asyncio.sleep(purge_delay)
+            await _purge_rows(source, user_id, source_shard)
+            await source.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Move a user and their todos to another shard.'
+    )
+    parser.add_argument('user_id', type=int)
+    parser.add_argument('shard', type=int, choices=range(len(shards.engines)))
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            await move_user(shards, args.user_id, args.shard)
+        finally:
+            await dispose_engines()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+
+from fastapizero.profiling import profiler
+from fastapizero.schemas import ProfileList, ProfileSummary
+
+
+def verify_profiling_token(
+    x_profile: Annotated[str | None, Header()] = None,
+):
+    if not profiler.enabled:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Not Found'
+        )
+    if not profiler.check_token(x_profile):
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN,
+            detail='Not enough permission!',
+        )
+
+
+router = APIRouter(
+    prefix='/admin',
+    tags=['admin'],
+    dependencies=[Depends(verify_profiling_token)],
+)
+
+
+@router.get('/profiles', response_model=ProfileList)
+def list_profiles():
+    return {'profiles': list(reversed(profiler.profiles))}
+
+
+@router.get('/profiles/{profile_id}', response_model=ProfileSummary)
+def read_profile(profile_id: int):
+    profile = profiler.get(profile_id)
+
+    if not profile:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Profile not found!'
+        )
+
+    return profile
+
+
+@router.get('/profiles/{profile_id}/pstats')
+def download_profile(profile_id: int):
+    profile = read_profile(profile_id)
+
+    return Response(
+        profile['data'],
+        media_type='application/octet-stream',
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename=profile-{profile_id}.pstats'
+            )
+        },
+    )
@@ -4,7 +4,7 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from fastapizero.database import get_session
 from fastapizero.models import User
@@ -14,7 +14,7 @@ from fastapizero.schemas import (
 from fastapizero.security import (
     create_access_token,
     get_current_user,
-    verify_password,
+    hashing_pool,
 )
 
 router = APIRouter(
@@ -23,17 +23,21 @@ router = APIRouter(
 )
 
 T_OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
 
 
 @router.post('/token', response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     session: T_Session,
     form_data: T_OAuth2Form,
 ):
-    user = session.scalar(select(User).where(User.email == form_data.username))
+    user = await session.scalar(
+        select(User).where(User.email == form_data.username)
+    )
 
-    if not user or not verify_password(form_data.password, user.password):
+    if not user or not await hashing_pool.verify(
+        form_data.password, user.password
+    ):
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect email or password!',
@@ -45,7 +49,7 @@ def login_for_access_token(
 
 
 @router.post('/refresh_token', response_model=Token)
-def refresh_access_token(
+async def refresh_access_token(
     user: User = Depends(get_current_user),
 ):
     new_access_token = create_access_token(data={'sub': user.email})
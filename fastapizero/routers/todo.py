@@ -1,94 +1,733 @@
+import asyncio
+import csv
+import io
+import time
+from datetime import datetime
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from psycopg.errors import ObjectNotInPrerequisiteState
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapizero.database import get_session
-from fastapizero.models import Todo, User
+from fastapizero.batching import todo_batcher
+from fastapizero.caching import conditional_response, make_etag
+from fastapizero.database import get_session, session_for_shard
+from fastapizero.events import render_sse, todo_events
+from fastapizero.models import (
+    Todo,
+    TodoCounter,
+    TodoDeletion,
+    TodoState,
+    TodoStateCount,
+    User,
+)
+from fastapizero.pagination import decode_cursor, encode_cursor
 from fastapizero.schemas import (
+    FilterTodo,
+    FilterTodoChanges,
+    FilterTodoExport,
+    FilterTodoPage,
     Message,
+    TodoBulkResultList,
+    TodoBulkUpdate,
+    TodoChanges,
+    TodoImportSummary,
     TodoList,
+    TodoPartialList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
 )
 from fastapizero.security import get_current_user
+from fastapizero.serialization import columns_for, json_response
+from fastapizero.tombstones import TOMBSTONE_RETENTION
 
 router = APIRouter(prefix='/todos', tags=['todos'])
 
 T_User = Annotated[User, Depends(get_current_user)]
-T_Session = Annotated[Session, Depends(get_session)]
+
+
+async def get_todo_session(
+    session: Annotated[AsyncSession, Depends(get_session)], user: T_User
+):
+    async with session_for_shard(session, user.shard) as todo_session:
+        try:
+            yield todo_session
+        except DBAPIError as exc:
+            # usuário congelado pelo move_user (ver TODO_CHANGES_FUNCTION)
+            if not isinstance(exc.orig, ObjectNotInPrerequisiteState):
+                raise
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Todos are being moved, try again later!',
+                headers={'Retry-After': '1'},
+            )
+
+
+T_Session = Annotated[AsyncSession, Depends(get_todo_session)]
+
+BULK_MAX_ITEMS = 1000
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FIELDS = list(TodoPublic.model_fields)
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_MAX_ERRORS_PER_CHUNK = 20
+IMPORT_MAX_RECORD_SIZE = 64 * 1024
+IMPORT_COPY_SQL = 'COPY todos (title, description, state, user_id) FROM STDIN'
+STREAM_KEEPALIVE_SECONDS = 15
+TODO_PUBLIC_COLUMNS = columns_for(Todo, TodoPublic)
+TODO_CURSOR_COLUMNS = (Todo.created_at, Todo.id)
 
 
 @router.post('/', response_model=TodoPublic)
-def create_todo(
+async def create_todo(
     todo: TodoSchema,
     user: T_User,
     session: T_Session,
 ):
-    db_todo: Todo = Todo(
-        title=todo.title,
-        description=todo.description,
-        state=todo.state,
-        user_id=user.id,
-    )
-    session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    values = {**todo.model_dump(), 'user_id': user.id}
+    if todo_batcher.enabled:
+        # o engine do shard do usuário; o lote usa sessões próprias
+        return await todo_batcher.insert(session.bind, values)
+
+    db_todo = await session.scalar(
+        insert(Todo).values(**values).returning(Todo)
+    )
+    await session.commit()
     return db_todo
 
 
-@router.get('/', response_model=TodoList)
-def list_todos(
+def _filter_todos(query, todo_filter: FilterTodo):
+    if todo_filter.title:
+        query = query.filter(Todo.title.contains(todo_filter.title))
+    if todo_filter.description:
+        query = query.filter(
+            Todo.description.contains(todo_filter.description)
+        )
+    if todo_filter.state:
+        query = query.filter(Todo.state == todo_filter.state)
+    if todo_filter.q:
+        # ILIKE nos dois campos usa os índices gin_trgm_ops
+        query = query.filter(
+            or_(
+                Todo.title.icontains(todo_filter.q, autoescape=True),
+                Todo.description.icontains(todo_filter.q, autoescape=True),
+            )
+        )
+    return query
+
+
+def _parse_fields(fields: str | None):
+    names = list(
+        dict.fromkeys(
+            name.strip() for name in (fields or '').split(',') if name.strip()
+        )
+    )
+    if not names:
+        return list(TodoPublic.model_fields)
+
+    unknown = [name for name in names if name not in TodoPublic.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f'Unknown fields: {", ".join(unknown)}',
+        )
+    return names
+
+
+def _select_columns(names: list[str]):
+    # o cursor precisa de created_at e id mesmo fora do fields
+    return [getattr(Todo, name) for name in names] + [
+        column for column in TODO_CURSOR_COLUMNS if column.key not in names
+    ]
+
+
+# exclude_unset: com fields= só as colunas pedidas aparecem na resposta
+@router.get(
+    '/', response_model=TodoPartialList, response_model_exclude_unset=True
+)
+async def list_todos(
+    request: Request,
+    response: Response,
+    session: T_Session,
+    user: T_User,
+    todo_filter: Annotated[FilterTodoPage, Query()],
+):
+    q, cursor, limit = todo_filter.q, todo_filter.cursor, todo_filter.limit
+
+    if q and cursor:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Cursor pagination is not available with q!',
+        )
+
+    names = _parse_fields(todo_filter.fields)
+
+    # a versão muda a cada escrita em todos do usuário (trigger)
+    counter = (
+        await session.execute(
+            select(TodoCounter.version, TodoCounter.updated_at).where(
+                TodoCounter.user_id == user.id
+            )
+        )
+    ).first()
+    version, last_modified = counter or (0, None)
+    not_modified = conditional_response(
+        request,
+        response,
+        make_etag(user.id, version, request.url.query),
+        last_modified,
+    )
+    if not_modified:
+        return not_modified
+
+    query = _filter_todos(
+        select(*_select_columns(names)).where(Todo.user_id == user.id),
+        todo_filter,
+    )
+
+    if cursor:
+        created_at, todo_id = decode_cursor(
+            cursor, datetime.fromisoformat, int
+        )
+        query = query.filter(
+            tuple_(Todo.created_at, Todo.id) > tuple_(created_at, todo_id)
+        )
+
+    if q:
+        rank = func.greatest(
+            func.similarity(Todo.title, q),
+            func.similarity(Todo.description, q),
+        )
+        query = query.order_by(rank.desc(), Todo.id)
+    else:
+        query = query.order_by(Todo.created_at, Todo.id)
+
+    rows = await session.execute(query.offset(todo_filter.offset).limit(limit))
+    rows = rows.mappings().all()
+    todos = [{name: row[name] for name in names} for row in rows]
+
+    next_cursor = None
+    if not q and limit and len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+    return json_response(
+        {'todos': todos, 'next_cursor': next_cursor}, response
+    )
+
+
+def _render_ndjson(todos, header: bool):
+    return ''.join(
+        TodoPublic.model_validate(todo, from_attributes=True).model_dump_json()
+        + '\n'
+        for todo in todos
+    )
+
+
+def _render_csv(todos, header: bool):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for todo in todos:
+        row = TodoPublic.model_validate(todo, from_attributes=True)
+        writer.writerow(row.model_dump(mode='json').values())
+    return buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', _render_ndjson),
+    'csv': ('text/csv', _render_csv),
+}
+
+
+@router.get('/export')
+async def export_todos(
+    session: T_Session,
+    user: T_User,
+    todo_filter: Annotated[FilterTodoExport, Query()],
+):
+    media_type, render = EXPORT_FORMATS[todo_filter.format]
+    query = _filter_todos(
+        select(Todo).where(Todo.user_id == user.id), todo_filter
+    ).order_by(Todo.id)
+    # a sessão da dependência fecha antes do corpo ser enviado
+    engine = session.bind
+
+    async def stream():
+        async with AsyncSession(engine) as stream_session:
+            result = await stream_session.stream_scalars(
+                query.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+            )
+            header = True
+            async for todos in result.partitions():
+                yield render(todos, header)
+                header = False
+
+            if header:
+                yield render([], header)
+
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename=todos.{todo_filter.format}'
+            )
+        },
+    )
+
+
+async def _iter_lines(stream):
+    # None marca uma linha acima do limite, descartada sem ir para a memória
+    buffer, oversized = b'', False
+    async for chunk in stream:
+        *lines, buffer = (buffer + chunk).split(b'\n')
+        for line in lines:
+            if oversized or len(line) > IMPORT_MAX_RECORD_SIZE:
+                oversized = False
+                yield None
+            else:
+                yield line.decode(errors='replace').rstrip('\r')
+
+        if len(buffer) > IMPORT_MAX_RECORD_SIZE:
+            buffer, oversized = b'', True
+
+    if oversized:
+        yield None
+    elif buffer:
+        yield buffer.decode(errors='replace').rstrip('\r')
+
+
+async def _iter_records(stream, format: str):
+    record, start, line_number = '', 0, 0
+
+    async for line in _iter_lines(stream):
+        line_number += 1
+        if not record:
+            start = line_number
+        # aspas sem par não podem engolir o resto do arquivo
+        if line is None or len(record) + len(line) > IMPORT_MAX_RECORD_SIZE:
+            yield start, None
+            record = ''
+            continue
+        record = f'{record}\n{line}' if record else line
+
+        # no CSV, aspas abertas indicam um campo com quebra de linha
+        if format == 'csv' and record.count('"') % 2:
+            continue
+        if record.strip():
+            yield start, record
+        record = ''
+
+    if record.strip():
+        yield start, record
+
+
+def _parse_records(records, format: str, header: list[str] | None):
+    for line, record in records:
+        if record is None:
+            yield line, f'Record exceeds {IMPORT_MAX_RECORD_SIZE} bytes'
+            continue
+
+        try:
+            if format == 'ndjson':
+                yield line, TodoSchema.model_validate_json(record)
+            else:
+                values = next(csv.reader([record]))
+                yield (
+                    line,
+                    TodoSchema.model_validate(dict(zip(header, values))),
+                )
+        except csv.Error:
+            yield line, 'Malformed CSV record'
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            location = '.'.join(str(part) for part in error['loc'])
+            message = (
+                f'{location}: {error["msg"]}' if location else error['msg']
+            )
+            yield line, message
+
+
+def _parse_header(record: str | None):
+    try:
+        header = record and next(csv.reader([record]))
+    except csv.Error:
+        header = None
+    if not header:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid CSV header!'
+        )
+
+    return header
+
+
+async def _copy_todos(session: AsyncSession, rows):
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+
+    async with raw_connection.driver_connection.cursor() as cursor:
+        async with cursor.copy(IMPORT_COPY_SQL) as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+
+@router.post('/import', response_model=TodoImportSummary)
+async def import_todos(
+    request: Request,
+    session: T_Session,
+    user: T_User,
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+):
+    started = time.perf_counter()
+    summary = {'imported': 0, 'rejected': 0, 'chunks': []}
+    header = None
+    pending = []
+
+    async def flush():
+        results = list(_parse_records(pending, format, header))
+        rows = [
+            (todo.title, todo.description, todo.state.name, user.id)
+            for _, todo in results
+            if isinstance(todo, TodoSchema)
+        ]
+        errors = [
+            {'line': line, 'error': error}
+            for line, error in results
+            if isinstance(error, str)
+        ]
+
+        await _copy_todos(session, rows)
+        await session.commit()
+
+        summary['imported'] += len(rows)
+        summary['rejected'] += len(errors)
+        summary['chunks'].append({
+            'chunk': len(summary['chunks']) + 1,
+            'imported': len(rows),
+            'rejected': len(errors),
+            'errors': errors[:IMPORT_MAX_ERRORS_PER_CHUNK],
+        })
+        pending.clear()
+
+    async for line, record in _iter_records(request.stream(), format):
+        if format == 'csv' and header is None:
+            header = _parse_header(record)
+            continue
+
+        pending.append((line, record))
+        if len(pending) >= IMPORT_CHUNK_SIZE:
+            await flush()
+
+    if pending:
+        await flush()
+
+    elapsed = time.perf_counter() - started
+    return {
+        **summary,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': summary['imported'] / elapsed if elapsed else 0.0,
+    }
+
+
+async def _delete_todos(session: AsyncSession, *criteria):
+    # DELETE e tombstone no mesmo comando, para o /todos/changes
+    deleted = (
+        delete(Todo)
+        .where(*criteria)
+        .returning(Todo.id, Todo.user_id)
+        .cte('deleted')
+    )
+    tombstones = await session.scalars(
+        insert(TodoDeletion)
+        .from_select(
+            ['todo_id', 'user_id'], select(deleted.c.id, deleted.c.user_id)
+        )
+        .returning(TodoDeletion.todo_id)
+        .add_cte(deleted)
+    )
+    return set(tombstones)
+
+
+def _parse_issued_at(value: str):
+    issued_at = datetime.fromisoformat(value)
+    # sem fuso não compara com now(): só um cursor forjado chega assim
+    if issued_at.tzinfo is None:
+        raise ValueError(value)
+    return issued_at
+
+
+@router.get('/changes', response_model=TodoChanges)
+async def list_todo_changes(
+    response: Response,
+    session: T_Session,
+    user: T_User,
+    changes_filter: Annotated[FilterTodoChanges, Query()],
+):
+    since, cursor, limit = (
+        changes_filter.since,
+        changes_filter.cursor,
+        changes_filter.limit,
+    )
+    if cursor:
+        # páginas seguintes ficam presas ao watermark da primeira; o que
+        # mudar no meio tem versão acima dele e vem no próximo since
+        watermark, now, last_version, last_id = decode_cursor(
+            cursor, int, _parse_issued_at, int, int
+        )
+    else:
+        # contador antes das linhas: versões até o watermark já foram
+        # commitadas, e as que commitarem depois ficam acima dele (ver
+        # TODO_CHANGES_FUNCTION)
+        now, watermark = (
+            await session.execute(
+                select(
+                    func.now(),
+                    select(TodoCounter.version)
+                    .where(TodoCounter.user_id == user.id)
+                    .scalar_subquery(),
+                )
+            )
+        ).one()
+        watermark = watermark or 0
+
+    query = select(*TODO_PUBLIC_COLUMNS, Todo.version).where(
+        Todo.user_id == user.id, Todo.version <= watermark
+    )
+    deleted = []
+
+    # sem since é a primeira sincronização: lista completa, sem tombstones
+    if since:
+        version, issued_at = decode_cursor(since, int, _parse_issued_at)
+        if issued_at < now - TOMBSTONE_RETENTION:
+            raise HTTPException(
+                status_code=HTTPStatus.GONE,
+                detail='Watermark expired, sync from scratch!',
+            )
+
+        query = query.where(Todo.version > version)
+        # tombstones só na primeira página
+        if not cursor:
+            deleted = await session.scalars(
+                select(TodoDeletion.todo_id).where(
+                    TodoDeletion.user_id == user.id,
+                    TodoDeletion.version > version,
+                    TodoDeletion.version <= watermark,
+                )
+            )
+            deleted = deleted.all()
+
+    if cursor:
+        query = query.where(
+            tuple_(Todo.version, Todo.id) > tuple_(last_version, last_id)
+        )
+
+    rows = await session.execute(
+        query.order_by(Todo.version, Todo.id).limit(limit)
+    )
+    rows = rows.mappings().all()
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_cursor(
+            watermark, now, rows[-1]['version'], rows[-1]['id']
+        )
+
+    # o cliente guarda o watermark só depois da última página
+    return json_response(
+        {
+            'todos': [
+                {name: row[name] for name in EXPORT_FIELDS} for row in rows
+            ],
+            'deleted': deleted,
+            'watermark': encode_cursor(watermark, now),
+            'next_cursor': next_cursor,
+        },
+        response,
+    )
+
+
+@router.get('/stats', response_model=TodoStats)
+async def todo_stats(session: T_Session, user: T_User):
+    # no máximo uma linha por estado, mantidas pelos triggers
+    counts = await session.execute(
+        select(TodoStateCount.state, TodoStateCount.count).where(
+            TodoStateCount.user_id == user.id
+        )
+    )
+    states = dict.fromkeys(TodoState, 0) | dict(counts.all())
+    return {'states': states, 'total': sum(states.values())}
+
+
+async def _stream_events(user_id: int, shard: int):
+    async with todo_events.subscribe(user_id, shard) as queue:
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), STREAM_KEEPALIVE_SECONDS
+                )
+            except TimeoutError:
+                # comentário SSE mantém proxies com a conexão aberta
+                yield ': keepalive\n\n'
+                continue
+            yield render_sse(event)
+
+
+@router.get('/stream')
+async def stream_todo_events(user: T_User):
+    # antes dos headers: depois deles o stream não tem mais como falhar
+    try:
+        await todo_events.wait_ready(user.shard)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail='Todo events are unavailable, try again later!',
+            headers={'Retry-After': '1'},
+        )
+
+    return StreamingResponse(
+        _stream_events(user.id, user.shard),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.post('/bulk', response_model=TodoList)
+async def create_todos_bulk(
+    todos: Annotated[
+        list[TodoSchema], Body(min_length=1, max_length=BULK_MAX_ITEMS)
+    ],
+    user: T_User,
     session: T_Session,
+):
+    db_todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [{**todo.model_dump(), 'user_id': user.id} for todo in todos],
+    )
+    db_todos = db_todos.all()
+    await session.commit()
+
+    return {'todos': db_todos}
+
+
+@router.patch('/bulk', response_model=TodoBulkResultList)
+async def patch_todos_bulk(
+    todos: Annotated[
+        list[TodoBulkUpdate], Body(min_length=1, max_length=BULK_MAX_ITEMS)
+    ],
     user: T_User,
-    title: str | None = None,
-    description: str | None = None,
-    state: str | None = None,
-    offset: int | None = None,
-    limit: int | None = None,
+    session: T_Session,
 ):
-    query = select(Todo).where(Todo.user_id == user.id)
+    ids = {todo.id for todo in todos}
+    owned = set(
+        await session.scalars(
+            select(Todo.id).where(Todo.user_id == user.id, Todo.id.in_(ids))
+        )
+    )
 
-    if title:
-        query = query.filter(Todo.title.contains(title))
-    if description:
-        query = query.filter(Todo.description.contains(description))
-    if state:
-        query = query.filter(Todo.state == state)
-    todos = session.scalars(query.offset(offset).limit(limit))
-    return {'todos': todos}
+    rows = [
+        todo.model_dump(exclude_unset=True)
+        for todo in todos
+        if todo.id in owned
+    ]
+    rows = [row for row in rows if len(row) > 1]  # só o id: nada a mudar
+    if rows:
+        # UPDATE por chave primária em executemany
+        await session.execute(update(Todo), rows)
+
+    db_todos = {
+        db_todo.id: db_todo
+        for db_todo in await session.scalars(
+            select(Todo)
+            .where(Todo.id.in_(owned))
+            .execution_options(populate_existing=True)
+        )
+    }
+    await session.commit()
+
+    return {
+        'results': [
+            {'id': todo.id, 'status': 'updated', 'todo': db_todos[todo.id]}
+            if todo.id in db_todos
+            else {'id': todo.id, 'status': 'not_found'}
+            for todo in todos
+        ]
+    }
+
+
+@router.delete('/bulk', response_model=TodoBulkResultList)
+async def delete_todos_bulk(
+    ids: Annotated[list[int], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    user: T_User,
+    session: T_Session,
+):
+    deleted = await _delete_todos(
+        session, Todo.user_id == user.id, Todo.id.in_(ids)
+    )
+    await session.commit()
+
+    return {
+        'results': [
+            {'id': todo_id, 'status': 'deleted'}
+            if todo_id in deleted
+            else {'id': todo_id, 'status': 'not_found'}
+            for todo_id in ids
+        ]
+    }
 
 
 @router.delete('/{todo_id}', response_model=Message)
-def delete_todo(todo_id: int, user: T_User, session: T_Session):
-    todo = session.scalar(
-        select(Todo).where(Todo.id == todo_id, Todo.user_id == user.id)
+async def delete_todo(todo_id: int, user: T_User, session: T_Session):
+    deleted = await _delete_todos(
+        session, Todo.id == todo_id, Todo.user_id == user.id
     )
 
-    if not todo:
+    if not deleted:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail='Task not found!',
         )
 
-    session.delete(todo)
-    session.commit()
+    await session.commit()
     return {'message': 'Task deleted!'}
 
 
 @router.patch('/{todo_id}', response_model=TodoPublic)
-def patch_todo(
+async def patch_todo(
     todo_id: int,
     session: T_Session,
     user: T_User,
     todo: TodoUpdate,
 ):
-    db_todo = session.scalar(
-        select(Todo).where(Todo.id == todo_id, Todo.user_id == user.id)
-    )
+    values = todo.model_dump(exclude_unset=True)
+    criteria = (Todo.id == todo_id, Todo.user_id == user.id)
+
+    if values:
+        db_todo = await session.scalar(
+            update(Todo)
+            .where(*criteria)
+            .values(**values)
+            .returning(Todo)
+            .execution_options(
+                synchronize_session=False, populate_existing=True
+            )
+        )
+    else:
+        db_todo = await session.scalar(select(Todo).where(*criteria))
 
     if not db_todo:
         raise HTTPException(
@@ -96,11 +735,6 @@ def patch_todo(
             detail='Task not found!',
         )
 
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
-
-    session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    await session.commit()
 
     return db_todo
@@ -1,65 +1,119 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapizero.database import get_session
+from fastapizero.caching import conditional_response, make_etag
+from fastapizero.database import execute_on_shard, get_session, shards
 from fastapizero.models import User
+from fastapizero.pagination import decode_cursor, encode_cursor
 from fastapizero.schemas import (
     Message,
     UserList,
     UserPublic,
     UserSchema,
 )
-from fastapizero.security import get_current_user, get_password_hash
+from fastapizero.security import (
+    get_current_user,
+    hashing_pool,
+    principal_cache,
+)
 
 router = APIRouter(prefix='/users', tags=['users'])
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
 T_CurrentUser = Annotated[User, Depends(get_current_user)]
 
+USER_UNIQUE_DETAILS = {
+    'users_username_key': 'Username already exists!',
+    'users_email_key': 'Email already exists!',
+}
+
 
 @router.post('/', response_model=UserPublic, status_code=HTTPStatus.CREATED)
-def create_user(user: UserSchema, session: T_Session):
-    db_user = session.scalar(
-        select(User).where(
-            (User.username == user.username) | (User.email == user.email)
-        )
+async def create_user(user: UserSchema, session: T_Session):
+    # checagem barata antes do argon2; a constraint cobre a corrida
+    existing = await session.scalar(
+        select(User.username)
+        .where(or_(User.username == user.username, User.email == user.email))
+        .limit(1)
     )
+    if existing is not None:
+        constraint = 'users_email_key'
+        if existing == user.username:
+            constraint = 'users_username_key'
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=USER_UNIQUE_DETAILS[constraint],
+        )
 
-    if db_user:
-        if db_user.username == user.username:
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail='Username already exists!',
-            )
-        elif db_user.email == user.email:
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail='Email already exists!',
+    try:
+        db_user = await session.scalar(
+            insert(User)
+            .values(
+                username=user.username,
+                email=user.email,
+                password=await hashing_pool.hash(user.password),
+                shard=shards.pick(user.username),
             )
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        password=get_password_hash(user.password),
-    )
-
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+            .returning(User)
+        )
+    except IntegrityError as exc:
+        await session.rollback()
+        detail = USER_UNIQUE_DETAILS.get(exc.orig.diag.constraint_name)
+        if detail is None:
+            raise
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+
+    # diretório primeiro: se o espelho falhar, o cadastro é desfeito e não
+    # sobra um espelho órfão travando o username e o email no shard
+    await session.commit()
+    try:
+        await execute_on_shard(
+            db_user.shard,
+            insert(User).values(
+                id=db_user.id,
+                username=db_user.username,
+                email=db_user.email,
+                password=db_user.password,
+                shard=db_user.shard,
+            ),
+        )
+    except Exception:
+        await session.execute(delete(User).where(User.id == db_user.id))
+        await session.commit()
+        raise
 
     return db_user
 
 
 @router.get('/', response_model=UserList)
-def read_users(session: T_Session, limit: int = 5, skip: int = 0):
-    users = session.scalars(select(User).limit(limit).offset(skip))
-    return {'users': users}
+async def read_users(
+    session: T_Session,
+    limit: int = 5,
+    skip: int = 0,
+    cursor: str | None = None,
+):
+    query = select(User)
+
+    if cursor:
+        (user_id,) = decode_cursor(cursor, int)
+        query = query.where(User.id > user_id)
+
+    query = query.order_by(User.id).limit(limit).offset(skip)
+    users = (await session.scalars(query)).all()
+
+    next_cursor = None
+    if limit and len(users) == limit:
+        next_cursor = encode_cursor(users[-1].id)
+
+    return {'users': users, 'next_cursor': next_cursor}
 
 
 @router.put('/{user_id}', response_model=UserPublic)
-def update_user(
+async def update_user(
     user_id: int,
     user: UserSchema,
     session: T_Session,
@@ -71,18 +125,30 @@ def update_user(
             detail='Not enough permission!',
         )
 
-    current_user.username = user.username
-    current_user.email = user.email
-    current_user.password = get_password_hash(user.password)
-
-    session.commit()
-    session.refresh(current_user)
+    subject, shard = current_user.email, current_user.shard
+    values = {
+        'username': user.username,
+        'email': user.email,
+        'password': await hashing_pool.hash(user.password),
+    }
+    db_user = await session.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(**values)
+        .returning(User)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    await execute_on_shard(
+        shard, update(User).where(User.id == user_id).values(**values)
+    )
+    await session.commit()
+    principal_cache.invalidate(subject)
 
-    return current_user
+    return db_user
 
 
 @router.delete('/{user_id}', response_model=Message)
-def delete_user(
+async def delete_user(
     user_id: int,
     session: T_Session,
     current_user: T_CurrentUser,
@@ -92,19 +158,38 @@ def delete_user(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission!'
         )
 
-    session.delete(current_user)
-    session.commit()
+    # os todos do usuário saem pelo ON DELETE CASCADE do banco
+    await execute_on_shard(
+        current_user.shard, delete(User).where(User.id == user_id)
+    )
+    await session.execute(delete(User).where(User.id == user_id))
+    await session.commit()
+    principal_cache.invalidate(current_user.email)
 
     return {'message': 'User deleted!'}
 
 
 @router.get('/{user_id}', response_model=UserPublic)
-def read_user(user_id: int, session: T_Session):
-    db_user = session.scalar(select(User).where(User.id == user_id))
+async def read_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    session: T_Session,
+):
+    db_user = await session.scalar(select(User).where(User.id == user_id))
 
     if not db_user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found!'
         )
 
+    not_modified = conditional_response(
+        request,
+        response,
+        make_etag(db_user.id, db_user.updated_at.isoformat()),
+        db_user.updated_at,
+    )
+    if not_modified:
+        return not_modified
+
     return db_user
@@ -1,6 +1,7 @@
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 from fastapizero.models import TodoState
 
@@ -24,6 +25,7 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
@@ -46,9 +48,109 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+
+
+class TodoPartial(BaseModel):
+    title: str | None = None
+    description: str | None = None
+    state: TodoState | None = None
+    id: int | None = None
+    user_id: int | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
+class TodoPartialList(BaseModel):
+    todos: list[TodoPartial]
+    next_cursor: str | None = None
+
+
+class TodoStats(BaseModel):
+    states: dict[TodoState, int]
+    total: int
+
+
+class FilterTodo(BaseModel):
+    title: str | None = None
+    description: str | None = None
+    state: str | None = None
+    q: str | None = Field(None, min_length=3)
+
+
+class FilterTodoPage(FilterTodo):
+    offset: int | None = None
+    limit: int | None = None
+    cursor: str | None = None
+    fields: str | None = None
+
+
+class FilterTodoChanges(BaseModel):
+    since: str | None = None
+    cursor: str | None = None
+    limit: int = Field(500, gt=0, le=5000)
+
+
+class FilterTodoExport(FilterTodo):
+    format: Literal['ndjson', 'csv'] = 'ndjson'
+
+
+class TodoChanges(BaseModel):
+    todos: list[TodoPublic]
+    deleted: list[int]
+    watermark: str
+    next_cursor: str | None = None
 
 
 class TodoUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+
+
+class TodoBulkUpdate(TodoUpdate):
+    id: int
+
+
+class TodoBulkResult(BaseModel):
+    id: int
+    status: Literal['updated', 'deleted', 'not_found']
+    todo: TodoPublic | None = None
+
+
+class TodoBulkResultList(BaseModel):
+    results: list[TodoBulkResult]
+
+
+class TodoImportError(BaseModel):
+    line: int
+    error: str
+
+
+class TodoImportChunk(BaseModel):
+    chunk: int
+    imported: int
+    rejected: int
+    errors: list[TodoImportError]
+
+
+class TodoImportSummary(BaseModel):
+    imported: int
+    rejected: int
+    chunks: list[TodoImportChunk]
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+class ProfileSummary(BaseModel):
+    id: int
+    method: str
+    path: str
+    status: int
+    elapsed_seconds: float
+    created_at: datetime
+    top: str
+
+
+class ProfileList(BaseModel):
+    profiles: list[ProfileSummary]
@@ -1,3 +1,9 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from http import HTTPStatus
 from zoneinfo import ZoneInfo
@@ -8,9 +14,10 @@ from jwt import decode, encode
 from jwt.exceptions import ExpiredSignatureError, PyJWTError
 from pwdlib import PasswordHash
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from fastapizero.database import get_session
+from fastapizero.metrics import observe_hashing
 from fastapizero.models import User
 from fastapizero.settings import Settings
 
@@ -27,6 +34,97 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class HashingPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers or os.cpu_count()
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+
+    async def _submit(self, operation: str, func, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Server busy, try again later!',
+                headers={'Retry-After': '1'},
+            )
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            observe_hashing(operation, time.perf_counter() - started)
+
+    async def hash(self, password: str):
+        return await self._submit('hash', get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str):
+        return await self._submit(
+            'verify', verify_password, plain_password, hashed_password
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    settings.HASHING_WORKERS, settings.HASHING_MAX_PENDING
+)
+
+
+class PrincipalCache:
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, subject: str):
+        entry = self._entries.get(subject)
+
+        if entry is None or entry[1] <= time.monotonic():
+            self._entries.pop(subject, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, subject: str, user: User):
+        self._entries[subject] = (user, time.monotonic() + self.ttl)
+        self._entries.move_to_end(subject)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        # só neste processo; os outros expiram em até ttl segundos
+        self._entries.pop(subject, None)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_TTL_SECONDS, settings.PRINCIPAL_CACHE_MAX_SIZE
+)
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
 
@@ -42,8 +140,23 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-def get_current_user(
-    session: Session = Depends(get_session),
+def token_subject(authorization: str | None):
+    # só identifica o dono do token; quem autentica é o get_current_user
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+
+    try:
+        payload = decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+    except PyJWTError:
+        return None
+    return payload.get('sub')
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
     token: str = Depends(oauth2_scheme),
 ):
     credentials_exception = HTTPException(
@@ -63,9 +176,16 @@ def get_current_user(
     except PyJWTError:
         raise credentials_exception
 
-    user = session.scalar(select(User).where(User.email == username))
+    user = principal_cache.get(username)
 
-    if not user:
-        raise credentials_exception
+    if user is None:
+        user = await session.scalar(select(User).where(User.email == username))
+
+        if not user:
+            raise credentials_exception
+
+        # o cache guarda uma cópia desanexada, nunca a instância da rota
+        session.expunge(user)
+        principal_cache.set(username, user)
 
-    return user
+    return await session.merge(user, load=False)
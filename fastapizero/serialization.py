@@ -0,0 +1,31 @@
+from typing import override
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+from fastapizero.settings import Settings
+
+settings = Settings()
+
+
+class FastJSONResponse(JSONResponse):
+    @override
+    def render(self, content):
+        # serializador do pydantic-core (Rust): datetime, Enum, UUID nativos
+        return to_json(content)
+
+
+def columns_for(model, schema):
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def json_response(content, response: Response):
+    # a rota devolve linhas já projetadas no schema público; no modo rápido
+    # a validação do response_model é pulada e o corpo vai direto pro JSON
+    if not settings.FAST_JSON:
+        return content
+
+    fast_response = FastJSONResponse(content)
+    fast_response.raw_headers.extend(response.raw_headers)
+    return fast_response
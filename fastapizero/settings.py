@@ -11,6 +11,41 @@ class Settings(BaseSettings):
         extra='ignore',  # dica preciosa do Dunossauro
     )
     DATABASE_URL: str
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 10.0
+    DATABASE_POOL_RECYCLE: int = 1800  # segundos; -1 desliga
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_CONNECT_TIMEOUT: int = 3  # segundos; 0 desliga
+    DATABASE_STATEMENT_TIMEOUT_MS: int = 30_000  # 0 desliga
+    DATABASE_REPLICA_URLS: str = ''  # separadas por vírgula
+    DATABASE_REPLICA_STICKY_SECONDS: int = 5
+    DATABASE_REPLICA_RETRY_SECONDS: int = 30
+    DATABASE_SHARD_URLS: str = ''  # shards 1..n; o shard 0 é DATABASE_URL
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    HASHING_WORKERS: int = 0  # 0 = um processo por núcleo
+    HASHING_MAX_PENDING: int = 64
+    # cache por worker: usuário removido ou senha trocada continua válido
+    # nos outros workers por até esse tempo
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 5
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10_000
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str = ''  # header X-Profile e endpoints /admin
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_BUFFER_SIZE: int = 50
+    SLOW_REQUEST_SECONDS: float = 1.0  # 0 desliga
+    FAST_JSON: bool = False
+    TODO_BATCH_ENABLED: bool = False  # group commit no POST /todos/
+    TODO_BATCH_MAX_DELAY_MS: float = 5.0
+    TODO_BATCH_MAX_SIZE: int = 100
+    TODO_TOMBSTONE_RETENTION_DAYS: int = 30  # watermarks mais velhos: 410
+    IDEMPOTENCY_TTL_SECONDS: int = 86_400
+    IDEMPOTENCY_LOCK_SECONDS: int = 60  # depois disso o dono é dado como morto
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_CACHE_SIZE: int = 10_000
+
+
+def split_urls(urls: str):
+    return [url.strip() for url in urls.split(',') if url.strip()]
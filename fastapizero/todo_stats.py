@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapizero.database import ShardMap, dispose_engines, shards
+from fastapizero.models import Todo, TodoState, TodoStateCount, User
+
+# Os triggers mantêm todo_state_counts; este job compara com um COUNT(*)
+# por usuário e corrige o drift. Pode rodar com a aplicação no ar.
+
+
+async def reconcile_user(session: AsyncSession, user_id: int):
+    # trava as linhas do contador: escritas concorrentes do usuário esperam
+    # no trigger e aplicam o delta sobre a contagem já corrigida
+    stored = dict(
+        (
+            await session.execute(
+                select(TodoStateCount.state, TodoStateCount.count)
+                .where(TodoStateCount.user_id == user_id)
+                .with_for_update()
+            )
+        ).all()
+    )
+    actual = dict(
+        (
+            await session.execute(
+                select(Todo.state, func.count())
+                .where(Todo.user_id == user_id)
+                .group_by(Todo.state)
+            )
+        ).all()
+    )
+
+    drift = {
+        state: actual.get(state, 0) - stored.get(state, 0)
+        for state in TodoState
+        if actual.get(state, 0) != stored.get(state, 0)
+    }
+    if drift:
+        upsert = pg_insert(TodoStateCount).values([
+            {'user_id': user_id, 'state': state, 'count': actual.get(state, 0)}
+            for state in drift
+        ])
+        await session.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[TodoStateCount.user_id, TodoStateCount.state],
+                set_={'count': upsert.excluded.count},
+            )
+        )
+
+    return drift
+
+
+async def reconcile(shard_map: ShardMap, user_ids: list[int] | None = None):
+    repaired = {}
+    for shard, engine in enumerate(shard_map.engines):
+        async with AsyncSession(engine) as session:
+            # os espelhos no shard 0 (diretório) não têm todos
+            ids = user_ids or list(
+                await session.scalars(
+                    select(User.id)
+                    .where(User.shard == shard)
+                    .order_by(User.id)
+                )
+            )
+            for user_id in ids:
+                drift = await reconcile_user(session, user_id)
+                # commit por usuário: o lock dura só uma contagem
+                await session.commit()
+                if drift:
+                    repaired[user_id] = drift
+
+    return repaired
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Reconcile per-state todo counters with the todos table.'
+    )
+    parser.add_argument('user_ids', type=int, nargs='*')
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            repaired = await reconcile(shards, args.user_ids)
+        finally:
+            await dispose_engines()
+
+        for user_id, drift in repaired.items():
+            changes = ', '.join(
+                f'{state.value} {delta:+d}' for state, delta in drift.items()
+            )
+            print(f'user {user_id}: {changes}')
+        print(f'{len(repaired)} users repaired')
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
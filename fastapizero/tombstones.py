@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapizero.database import ShardMap, dispose_engines, shards
+from fastapizero.models import TodoDeletion
+from fastapizero.settings import Settings
+
+settings = Settings()
+
+# Tombstones só servem ao /todos/changes: este job apaga os mais velhos que
+# a retenção, e o /todos/changes responde 410 a watermarks dessa idade para
+# o cliente sincronizar do zero. Pode rodar com a aplicação no ar.
+
+TOMBSTONE_RETENTION = timedelta(days=settings.TODO_TOMBSTONE_RETENTION_DAYS)
+PRUNE_CHUNK_SIZE = 5000
+
+
+async def prune(shard_map: ShardMap, retention: timedelta):
+    pruned = 0
+    for engine in shard_map.engines:
+        async with AsyncSession(engine) as session:
+            while True:
+                expired = (
+                    select(TodoDeletion.id)
+                    .where(TodoDeletion.deleted_at < func.now() - retention)
+                    .limit(PRUNE_CHUNK_SIZE)
+                )
+                result = await session.execute(
+                    delete(TodoDeletion)
+                    .where(TodoDeletion.id.in_(expired))
+                    .execution_options(synchronize_session=False)
+                )
+                # commit por lote: transações curtas numa tabela grande
+                await session.commit()
+
+                pruned += result.rowcount
+                if result.rowcount < PRUNE_CHUNK_SIZE:
+                    break
+
+    return pruned
+
+
+def main():
+    argparse.ArgumentParser(
+        description=(
+            'Delete todo tombstones older than TODO_TOMBSTONE_RETENTION_DAYS.'
+        )
+    ).parse_args()
+
+    async def run():
+        try:
+            pruned = await prune(shards, TOMBSTONE_RETENTION)
+        finally:
+            await dispose_engines()
+
+        print(f'{pruned} tombstones pruned')
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
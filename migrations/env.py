@@ -5,13 +5,17 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from fastapizero.settings import Settings
+from fastapizero.settings import Settings, split_urls
 from fastapizero.models import table_registry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option('sqlalchemy.url', Settings().DATABASE_URL)
+settings = Settings()
+config.set_main_option('sqlalchemy.url', settings.DATABASE_URL)
+
+# shard 0 é o banco principal; todos os shards têm o mesmo schema
+shard_urls = [settings.DATABASE_URL, *split_urls(settings.DATABASE_SHARD_URLS)]
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -41,6 +45,9 @@ def run_migrations_offline() -> None:
     Calls to context.execute() here emit the given string to the
     script output.
 
+    Only the main database is rendered; point DATABASE_URL at each
+    shard to generate its script.
+
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
@@ -59,21 +66,24 @@ def run_migrations_online() -> None:
 
     In this scenario we need to create an Engine
     and associate a connection with the context.
+    Every shard is migrated in turn.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
-
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
+    for url in shard_urls:
+        connectable = engine_from_config(
+            config.get_section(config.config_ini_section, {}),
+            prefix="sqlalchemy.",
+            poolclass=pool.NullPool,
+            url=url,
         )
 
-        with context.begin_transaction():
-            context.run_migrations()
+        with connectable.connect() as connection:
+            context.configure(
+                connection=connection, target_metadata=target_metadata
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,62 @@
+"""todo events triggers
+
+Revision ID: 30f3b5539bae
+Revises: 6c7a9e00c434
+Create Date: 2026-10-18 18:32:51.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '30f3b5539bae'
+down_revision: Union[str, None] = '6c7a9e00c434'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+    CREATE OR REPLACE FUNCTION todo_events_notify() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM pg_notify('todo_events', payload)
+        FROM (
+            SELECT json_build_object(
+                'user_id', user_id,
+                'event', TG_ARGV[0],
+                'ids', json_agg(id ORDER BY id)
+            )::text AS payload
+            FROM (
+                SELECT user_id, id,
+                    (row_number() OVER (PARTITION BY user_id ORDER BY id) - 1)
+                        / 500 AS chunk
+                FROM changed_rows
+            ) AS changed
+            GROUP BY user_id, chunk
+            ORDER BY user_id, chunk
+        ) AS notifications;
+        RETURN NULL;
+    END
+    $$
+    """)
+    for event, transition, name in (
+        ('INSERT', 'NEW', 'created'),
+        ('UPDATE', 'NEW', 'updated'),
+        ('DELETE', 'OLD', 'deleted'),
+    ):
+        op.execute(f"""
+        CREATE TRIGGER todo_events_{event.lower()}
+        AFTER {event} ON todos
+        REFERENCING {transition} TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION todo_events_notify('{name}')
+        """)
+
+
+def downgrade() -> None:
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        op.execute(f'DROP TRIGGER todo_events_{event.lower()} ON todos')
+    op.execute('DROP FUNCTION todo_events_notify()')
@@ -0,0 +1,32 @@
+"""trigram search indexes
+
+Revision ID: 4413f5ae09f1
+Revises: 7a90a369577d
+Create Date: 2026-10-18 11:05:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4413f5ae09f1'
+down_revision: Union[str, None] = '7a90a369577d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # índices GIN em tabela grande: CONCURRENTLY para não travar escritas
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_description_trgm', 'todos', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_todos_title_trgm', 'todos', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_title_trgm', table_name='todos', postgresql_concurrently=True)
+        op.drop_index('ix_todos_description_trgm', table_name='todos', postgresql_concurrently=True)
@@ -0,0 +1,33 @@
+"""todos user_id indexes
+
+Revision ID: 6c06a38a4de5
+Revises: 4413f5ae09f1
+Create Date: 2026-10-18 11:31:52.114870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c06a38a4de5'
+down_revision: Union[str, None] = '4413f5ae09f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_user_id_id', 'todos', ['user_id', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_todos_user_id_state', 'todos', ['user_id', 'state'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_todos_user_id_updated_at', 'todos', ['user_id', 'updated_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_user_id_updated_at', table_name='todos', postgresql_concurrently=True)
+        op.drop_index('ix_todos_user_id_state', table_name='todos', postgresql_concurrently=True)
+        op.drop_index('ix_todos_user_id_id', table_name='todos', postgresql_concurrently=True)
@@ -0,0 +1,55 @@
+"""todo counters lock order
+
+Revision ID: 6c7a9e00c434
+Revises: 83c3cad45cf5
+Create Date: 2026-10-18 17:40:12.615932
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c7a9e00c434'
+down_revision: Union[str, None] = '83c3cad45cf5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+    CREATE OR REPLACE FUNCTION todo_counters_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO todo_counters AS counter (user_id, version, updated_at)
+        SELECT changed_rows.user_id, 1, now()
+        FROM changed_rows
+        JOIN users ON users.id = changed_rows.user_id
+        GROUP BY changed_rows.user_id
+        ORDER BY changed_rows.user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET version = counter.version + 1, updated_at = now();
+        RETURN NULL;
+    END
+    $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+    CREATE OR REPLACE FUNCTION todo_counters_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO todo_counters AS counter (user_id, version, updated_at)
+        SELECT changed_rows.user_id, 1, now()
+        FROM changed_rows
+        JOIN users ON users.id = changed_rows.user_id
+        GROUP BY changed_rows.user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET version = counter.version + 1, updated_at = now();
+        RETURN NULL;
+    END
+    $$
+    """)
@@ -0,0 +1,29 @@
+"""keyset pagination index
+
+Revision ID: 7a90a369577d
+Revises: 9a544012b363
+Create Date: 2026-10-18 10:42:11.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a90a369577d'
+down_revision: Union[str, None] = '9a544012b363'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_user_id_created_at_id', 'todos', ['user_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_user_id_created_at_id', table_name='todos', postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+"""cascade todos on user delete
+
+Revision ID: bb10b79b6add
+Revises: 6c06a38a4de5
+Create Date: 2026-10-18 11:58:20.441093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bb10b79b6add'
+down_revision: Union[str, None] = '6c06a38a4de5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NOT VALID troca a constraint sem varrer todos sob ACCESS EXCLUSIVE; o
+    # VALIDATE varre em outra transação, com um lock que não bloqueia escritas
+    op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+    op.create_foreign_key('todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id'], ondelete='CASCADE', postgresql_not_valid=True)
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE todos VALIDATE CONSTRAINT todos_user_id_fkey')
+
+
+def downgrade() -> None:
+    op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+    op.create_foreign_key('todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id'], postgresql_not_valid=True)
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE todos VALIDATE CONSTRAINT todos_user_id_fkey')
@@ -2,6 +2,7 @@ from contextlib import contextmanager
 from datetime import datetime
 
 import pytest
+import pytest_asyncio
 from factory import (
     Factory,
     Faker,
@@ -10,8 +11,8 @@ from factory import (
     fuzzy,
 )
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine, event
-from sqlalchemy.orm import Session
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from testcontainers.postgres import PostgresContainer
 
 from fastapizero.app import app
@@ -22,7 +23,7 @@ from fastapizero.models import (
     User,
     table_registry,
 )
-from fastapizero.security import get_password_hash
+from fastapizero.security import get_password_hash, principal_cache
 
 
 class UserFactory(Factory):
@@ -44,6 +45,11 @@ class TodoFactory(Factory):
     user_id = 1
 
 
+@pytest.fixture(autouse=True)
+def _clear_principal_cache():
+    principal_cache.clear()
+
+
 @pytest.fixture
 def client(session):
     def get_session_override():
@@ -59,20 +65,39 @@ def client(session):
 @pytest.fixture(scope='session')
 def engine():
     with PostgresContainer('postgres:16', driver='psycopg') as postgres:
-        _engine = create_engine(postgres.get_connection_url())
-
-        with _engine.begin():
-            yield _engine
+        _engine = create_async_engine(postgres.get_connection_url())
+        yield _engine
 
 
-@pytest.fixture(scope='function')
-def session(engine):
-    table_registry.metadata.create_all(engine)  # cria dados
+@pytest_asyncio.fixture
+async def session(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)  # cria dados
 
-    with Session(engine) as session:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
 
-    table_registry.metadata.drop_all(engine)  # apaga dados
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)  # apaga dados
+
+
+@pytest_asyncio.fixture
+async def shard_engine(engine, session):
+    # segundo banco no mesmo servidor, com o mesmo schema
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level='AUTOCOMMIT')
+        await conn.execute(text('CREATE DATABASE shard_1'))
+
+    _engine = create_async_engine(engine.url.set(database='shard_1'))
+    async with _engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    yield _engine
+
+    await _engine.dispose()
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level='AUTOCOMMIT')
+        await conn.execute(text('DROP DATABASE shard_1'))
 
 
 @contextmanager
@@ -95,8 +120,8 @@ def mock_db_time():
     return _mock_db_time
 
 
-@pytest.fixture
-def user(session):
+@pytest_asyncio.fixture
+async def user(session):
     password = 'password'
 
     user = UserFactory(
@@ -104,20 +129,20 @@ def user(session):
     )
 
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     user.clean_password = password
 
     return user
 
 
-@pytest.fixture
-def other_user(session):
+@pytest_asyncio.fixture
+async def other_user(session):
     user = UserFactory()
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     return user
 
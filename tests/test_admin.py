@@ -0,0 +1,75 @@
+import logging
+import marshal
+from http import HTTPStatus
+
+import pytest
+
+from fastapizero import app as app_module
+from fastapizero.profiling import profiler
+
+TOKEN = 'profiling-token'
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setattr(profiler, 'enabled', True)
+    monkeypatch.setattr(profiler, 'token', TOKEN)
+    profiler.profiles.clear()
+
+    yield profiler
+
+    profiler.profiles.clear()
+
+
+def test_profile_request_should_be_listed_and_downloadable(
+    client, user, profiling
+):
+    response = client.get(f'/users/{user.id}', headers={'X-Profile': TOKEN})
+    profile_id = int(response.headers['X-Profile-Id'])
+
+    response = client.get('/admin/profiles', headers={'X-Profile': TOKEN})
+    (profile,) = response.json()['profiles']
+
+    assert profile['id'] == profile_id
+    assert profile['path'] == f'/users/{user.id}'
+    assert profile['status'] == HTTPStatus.OK
+    assert 'cumulative' in profile['top']
+
+    response = client.get(
+        f'/admin/profiles/{profile_id}/pstats', headers={'X-Profile': TOKEN}
+    )
+
+    assert any(
+        name == 'read_user' for _, _, name in marshal.loads(response.content)
+    )
+
+
+def test_profile_request_without_token_should_not_profile(
+    client, user, profiling
+):
+    response = client.get(f'/users/{user.id}', headers={'X-Profile': 'x'})
+
+    assert 'X-Profile-Id' not in response.headers
+    assert not profiling.profiles
+
+
+def test_admin_profiles_should_require_token(client, profiling):
+    response = client.get('/admin/profiles', headers={'X-Profile': 'x'})
+
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+def test_admin_profiles_should_be_hidden_when_disabled(client):
+    response = client.get('/admin/profiles', headers={'X-Profile': TOKEN})
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_slow_request_should_log_sql(client, user, monkeypatch, caplog):
+    monkeypatch.setattr(app_module.settings, 'SLOW_REQUEST_SECONDS', 1e-9)
+
+    with caplog.at_level(logging.WARNING, logger='fastapizero.profiling'):
+        client.get(f'/users/{user.id}')
+
+    assert f'slow request GET /users/{user.id}' in caplog.text
+    assert 'FROM users' in caplog.text
@@ -5,3 +5,35 @@ def test_read_root_deve_retornar_ok_e_ola_mundo(client):
     response = client.get('/')
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'Olá, mundo!'}
+
+
+def test_metrics_should_expose_pool_metrics(client):
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    for name in (
+        'db_pool_size',
+        'db_pool_checked_out',
+        'db_pool_overflow',
+        'db_pool_wait_seconds_bucket',
+        'db_pool_timeouts_total',
+    ):
+        assert name in response.text
+
+
+def test_metrics_should_record_route_latency_and_sql(client, user, token):
+    client.get(f'/users/{user.id}')
+    client.get('/todos/?limit=1', headers={'Authorization': f'Bearer {token}'})
+
+    response = client.get('/metrics')
+    labels = 'method="GET",route="/users/{user_id}"'
+
+    assert f'http_requests_total{{{labels},status="200"}}' in response.text
+    assert f'http_request_seconds_count{{{labels}}}' in response.text
+    assert f'http_request_db_statements_count{{{labels}}}' in response.text
+    assert 'password_hashing_seconds_count{operation="verify"}' in (
+        response.text
+    )
+    assert 'route="/todos/"' in response.text
+    assert 'route="/users/1"' not in response.text
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy.exc import IntegrityError
+
+from fastapizero.batching import TodoInsertBatcher, todo_batcher
+
+TIMEOUT = 5
+BATCH_COUNT = 'todo_insert_batch_size_count'
+
+
+def todo_values(user_id, title='batched'):
+    return {
+        'title': title,
+        'description': 'd',
+        'state': 'draft',
+        'user_id': user_id,
+    }
+
+
+@pytest.mark.asyncio
+async def test_batcher_should_coalesce_concurrent_inserts(engine, user):
+    batcher = TodoInsertBatcher(enabled=True, max_delay=0.05, max_size=100)
+    batches = REGISTRY.get_sample_value(BATCH_COUNT) or 0
+    n_todos = 5
+
+    todos = await asyncio.gather(
+        *(
+            batcher.insert(engine, todo_values(user.id, f'todo {n}'))
+            for n in range(n_todos)
+        )
+    )
+
+    assert [todo.title for todo in todos] == [
+        f'todo {n}' for n in range(n_todos)
+    ]
+    assert len({todo.id for todo in todos}) == n_todos
+    assert REGISTRY.get_sample_value(BATCH_COUNT) == batches + 1
+
+
+@pytest.mark.asyncio
+async def test_batcher_should_flush_full_batch_without_waiting(engine, user):
+    batcher = TodoInsertBatcher(enabled=True, max_delay=60, max_size=2)
+
+    todos = await asyncio.wait_for(
+        asyncio.gather(
+            batcher.insert(engine, todo_values(user.id)),
+            batcher.insert(engine, todo_values(user.id)),
+        ),
+        TIMEOUT,
+    )
+
+    assert all(todo.id for todo in todos)
+
+
+@pytest.mark.asyncio
+async def test_batcher_should_isolate_failing_rows(engine, user):
+    batcher = TodoInsertBatcher(enabled=True, max_delay=0.01, max_size=100)
+
+    good, bad = await asyncio.gather(
+        batcher.insert(engine, todo_values(user.id)),
+        batcher.insert(engine, todo_values(user.id + 1000)),
+        return_exceptions=True,
+    )
+
+    assert good.user_id == user.id
+    assert isinstance(bad, IntegrityError)
+
+
+def test_create_todo_with_batching(client, token, monkeypatch):
+    monkeypatch.setattr(todo_batcher, 'enabled', True)
+
+    response = client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'a', 'description': 'b', 'state': 'Draft'},
+    )
+
+    assert response.json()['title'] == 'a'
+    assert response.json()['state'] == 'Draft'
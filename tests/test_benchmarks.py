@@ -0,0 +1,30 @@
+import httpx
+import pytest
+
+from benchmarks.suite import compare, run, seed
+from fastapizero.app import app
+
+
+@pytest.mark.asyncio
+async def test_benchmark_suite_should_run_the_mix(client):
+    # client aplica o override de sessão do app; concorrência 1 = uma sessão
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app), base_url='http://bench'
+    ) as bench_client:
+        users = await seed(bench_client, n_users=2, n_todos=3)
+        summary = await run(bench_client, users, n_requests=40, concurrency=1)
+
+    assert all(user.token for user in users)
+    assert summary['total']['errors'] == 0
+    assert summary['total']['p50_ms'] <= summary['total']['p99_ms']
+
+
+def test_compare_should_flag_latency_regressions():
+    baseline = {
+        'summary': {'list': {'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 30}}
+    }
+    report = {'summary': {'list': {'p50_ms': 11, 'p95_ms': 30, 'p99_ms': 31}}}
+
+    assert compare(report, baseline, max_regression=0.2) == [
+        ('list', 'p95_ms', 0.5)
+    ]
@@ -0,0 +1,317 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from fastapi import Request, Response
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fastapizero import database
+from fastapizero.database import (
+    STICKY_COOKIE,
+    ReplicaSet,
+    ShardMap,
+    execute_on_shard,
+    get_session,
+)
+from fastapizero.models import Todo, TodoDeletion, User
+from fastapizero.rebalance import move_user
+from fastapizero.security import principal_cache
+from tests.conftest import TodoFactory
+
+UNREACHABLE_URL = 'postgresql+psycopg://app_user@127.0.0.1:1/app_db'
+
+
+def make_request(method, cookies=''):
+    headers = [(b'cookie', cookies.encode())] if cookies else []
+    return Request({'type': 'http', 'method': method, 'headers': headers})
+
+
+async def session_bind(request, response=None):
+    sessions = get_session(request, response or Response())
+    session = await anext(sessions)
+    await sessions.aclose()
+    return session.bind
+
+
+@pytest.fixture
+def primary(monkeypatch):
+    engine = create_async_engine(UNREACHABLE_URL)
+    monkeypatch.setattr(database, 'engine', engine)
+    return engine
+
+
+def test_replica_set_round_robin():
+    engines = ['a', 'b', 'c']
+    replicas = ReplicaSet(engines, retry_after=30)
+
+    assert replicas.candidates() == ['a', 'b', 'c']
+    assert replicas.candidates() == ['b', 'c', 'a']
+
+    replicas.mark_down('c')
+
+    assert replicas.candidates() == ['a', 'b']
+
+
+@pytest.mark.asyncio
+async def test_get_session_should_read_from_replica(
+    monkeypatch, engine, primary
+):
+    monkeypatch.setattr(database, 'replicas', ReplicaSet([engine], 30))
+
+    assert await session_bind(make_request('GET')) is engine
+
+
+@pytest.mark.asyncio
+async def test_get_session_should_write_to_primary_and_stick(
+    monkeypatch, engine, primary
+):
+    monkeypatch.setattr(database, 'replicas', ReplicaSet([engine], 30))
+    response = Response()
+
+    assert await session_bind(make_request('POST'), response) is primary
+    assert STICKY_COOKIE in response.headers['set-cookie']
+
+    request = make_request('GET', f'{STICKY_COOKIE}=1')
+
+    assert await session_bind(request) is primary
+
+
+@pytest.mark.asyncio
+async def test_get_session_should_skip_unhealthy_replica(monkeypatch, engine):
+    replica = create_async_engine(UNREACHABLE_URL)
+    replicas = ReplicaSet([replica], 30)
+    monkeypatch.setattr(database, 'replicas', replicas)
+    monkeypatch.setattr(database, 'engine', engine)
+
+    assert await session_bind(make_request('GET')) is engine
+    assert replicas.candidates() == []
+
+
+@pytest.mark.asyncio
+async def test_get_session_should_skip_saturated_replica(monkeypatch, engine):
+    replica = create_async_engine(
+        engine.url, pool_size=1, max_overflow=0, pool_timeout=0.1
+    )
+    replicas = ReplicaSet([replica], 30)
+    monkeypatch.setattr(database, 'replicas', replicas)
+    monkeypatch.setattr(database, 'engine', engine)
+
+    try:
+        async with replica.connect():
+            assert await session_bind(make_request('GET')) is engine
+    finally:
+        await replica.dispose()
+
+    assert replicas.candidates() == [replica]
+
+
+def test_build_engine_should_bound_connect_and_pre_ping(monkeypatch):
+    captured = {}
+    monkeypatch.setattr(
+        database,
+        'create_async_engine',
+        lambda url, **kwargs: captured.update(kwargs),
+    )
+
+    database.build_engine(UNREACHABLE_URL)
+
+    connect_args = captured['connect_args']
+    timeout = database.settings.DATABASE_CONNECT_TIMEOUT
+    assert connect_args['connect_timeout'] == timeout
+    assert connect_args['tcp_user_timeout'] == timeout * 1000
+
+
+def test_shard_map_pick_should_be_stable():
+    shards = ShardMap(['a', 'b', 'c'])
+
+    assert shards.pick('alice') == shards.pick('alice')
+    assert {shards.pick(f'user{n}') for n in range(30)} == {0, 1, 2}
+
+
+@pytest_asyncio.fixture
+async def sharded_user(monkeypatch, session, engine, shard_engine, user):
+    monkeypatch.setattr(database, 'shards', ShardMap([engine, shard_engine]))
+    user.shard = 1
+    await session.commit()
+    await execute_on_shard(
+        1,
+        insert(User).values(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            password=user.password,
+            shard=1,
+        ),
+    )
+
+    return user
+
+
+@pytest.mark.asyncio
+async def test_todo_routes_should_use_user_shard(
+    session, client, token, sharded_user, shard_engine
+):
+    response = client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'a', 'description': 'b', 'state': 'Draft'},
+    )
+
+    async with AsyncSession(shard_engine) as shard_session:
+        todo = await shard_session.get(Todo, response.json()['id'])
+
+    assert todo.user_id == sharded_user.id
+    assert not await session.scalar(select(func.count()).select_from(Todo))
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert [t['id'] for t in response.json()['todos']] == [todo.id]
+
+
+@pytest.mark.asyncio
+async def test_move_user_should_carry_todos_between_shards(
+    session, engine, shard_engine, user
+):
+    shards = ShardMap([engine, shard_engine])
+    n_todos = 3
+    session.add_all(TodoFactory.create_batch(n_todos, user_id=user.id))
+    await session.commit()
+    ids = set(await session.scalars(select(Todo.id)))
+    titles = set(await session.scalars(select(Todo.title)))
+    principal_cache.set(user.email, user)
+
+    await move_user(shards, user.id, 1, purge_delay=0)
+
+    async with AsyncSession(shard_engine) as shard_session:
+        moved = set(await shard_session.scalars(select(Todo.title)))
+        moved_ids = set(await shard_session.scalars(select(Todo.id)))
+        tombstones = set(
+            await shard_session.scalars(select(TodoDeletion.todo_id))
+        )
+        mirror = await shard_session.get(User, user.id)
+
+    await session.refresh(user)
+
+    assert moved == titles
+    assert tombstones == ids - moved_ids
+    assert mirror.email == user.email
+    assert not mirror.frozen
+    assert user.shard == 1
+    assert user.frozen
+    assert principal_cache.get(user.email) is None
+    assert not await session.scalar(select(func.count()).select_from(Todo))
+
+    await move_user(shards, user.id, 0, purge_delay=0)
+
+    async with AsyncSession(shard_engine) as shard_session:
+        assert not await shard_session.get(User, user.id)
+
+    await session.refresh(user)
+
+    assert set(await session.scalars(select(Todo.title))) == titles
+    assert not user.frozen
+
+
+@pytest.mark.asyncio
+async def test_move_user_should_not_collide_with_target_ids(
+    session, engine, shard_engine, user, other_user
+):
+    shards = ShardMap([engine, shard_engine])
+    session.add(TodoFactory(user_id=user.id))
+    await session.commit()
+
+    # o shard de destino já usou os mesmos ids para outro usuário
+    async with AsyncSession(shard_engine) as shard_session:
+        await shard_session.execute(
+            insert(User).values(
+                id=other_user.id,
+                username=other_user.username,
+                email=other_user.email,
+                password=other_user.password,
+                shard=1,
+            )
+        )
+        shard_session.add(TodoFactory(user_id=other_user.id))
+        await shard_session.commit()
+
+    await move_user(shards, user.id, 1, purge_delay=0)
+
+    async with AsyncSession(shard_engine) as shard_session:
+        owners = await shard_session.scalars(
+            select(Todo.user_id).order_by(Todo.id)
+        )
+        assert owners.all() == [other_user.id, user.id]
+
+
+@pytest.mark.asyncio
+async def test_move_user_should_not_tombstone_reused_ids(
+    session, engine, shard_engine, user
+):
+    shards = ShardMap([engine, shard_engine])
+    removed, kept, other = TodoFactory.create_batch(3, user_id=user.id)
+    session.add_all([removed, kept, other])
+    await session.commit()
+    await session.delete(removed)
+    session.add(TodoDeletion(todo_id=removed.id, user_id=user.id))
+    await session.commit()
+
+    await move_user(shards, user.id, 1, purge_delay=0)
+
+    # ids 1 e 2 voltam no destino para kept e other; só o 3 some
+    async with AsyncSession(shard_engine) as shard_session:
+        moved_ids = set(await shard_session.scalars(select(Todo.id)))
+        tombstones = set(
+            await shard_session.scalars(select(TodoDeletion.todo_id))
+        )
+
+    assert moved_ids == {1, 2}
+    assert tombstones == {3}
+
+
+@pytest.mark.asyncio
+async def test_move_user_should_wait_for_writes_in_flight(
+    session, engine, shard_engine, user
+):
+    shards = ShardMap([engine, shard_engine])
+
+    async with AsyncSession(engine) as writer:
+        writer.add(TodoFactory(user_id=user.id, title='in flight'))
+        await writer.flush()
+
+        move = asyncio.create_task(
+            move_user(shards, user.id, 1, purge_delay=0)
+        )
+        await asyncio.sleep(0.5)
+        assert not move.done()
+
+        await writer.commit()
+    await asyncio.wait_for(move, 5)
+
+    async with AsyncSession(shard_engine) as shard_session:
+        moved = list(await shard_session.scalars(select(Todo.title)))
+
+    assert moved == ['in flight']
+
+
+@pytest.mark.asyncio
+async def test_todo_writes_should_fail_while_user_is_frozen(
+    session, client, user, token
+):
+    user.frozen = True
+    await session.commit()
+
+    response = client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'a', 'description': 'b', 'state': 'Draft'},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
+    assert response.json() == {
+        'detail': 'Todos are being moved, try again later!'
+    }
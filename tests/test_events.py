@@ -0,0 +1,153 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import text
+
+from fastapizero.events import TodoEventBroker, render_sse, todo_events
+from tests.conftest import TodoFactory
+
+TIMEOUT = 5
+
+
+@pytest.mark.asyncio
+async def test_todo_events_should_push_committed_writes(
+    session, client, user, token, engine
+):
+    broker = TodoEventBroker([engine.url])
+
+    try:
+        async with broker.subscribe(user.id) as queue:
+            # rollback: o NOTIFY nunca é entregue
+            session.add(TodoFactory(user_id=user.id))
+            await session.flush()
+            await session.rollback()
+
+            client.post(
+                '/todos/',
+                headers={'Authorization': f'Bearer {token}'},
+                json={'title': 'a', 'description': 'b', 'state': 'Draft'},
+            )
+            event = await asyncio.wait_for(queue.get(), TIMEOUT)
+    finally:
+        await broker.close()
+
+    assert event == {'user_id': user.id, 'event': 'created', 'ids': [2]}
+    assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_todo_events_should_only_reach_the_owner(
+    session, user, other_user, engine
+):
+    broker = TodoEventBroker([engine.url])
+
+    try:
+        async with broker.subscribe(user.id) as queue:
+            session.add(TodoFactory(user_id=other_user.id))
+            todo = TodoFactory(user_id=user.id)
+            session.add(todo)
+            await session.commit()
+            event = await asyncio.wait_for(queue.get(), TIMEOUT)
+    finally:
+        await broker.close()
+
+    assert event['ids'] == [todo.id]
+    assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_todo_events_should_cover_copy_imports(
+    client, user, token, engine
+):
+    broker = TodoEventBroker([engine.url])
+    n_todos = 3
+
+    try:
+        async with broker.subscribe(user.id) as queue:
+            client.post(
+                '/todos/import',
+                content='\n'.join(
+                    '{"title": "a", "description": "b", "state": "Todo"}'
+                    for _ in range(n_todos)
+                ),
+                headers={'Authorization': f'Bearer {token}'},
+            )
+            event = await asyncio.wait_for(queue.get(), TIMEOUT)
+    finally:
+        await broker.close()
+
+    assert event == {
+        'user_id': user.id,
+        'event': 'created',
+        'ids': list(range(1, n_todos + 1)),
+    }
+
+
+@pytest.mark.asyncio
+async def test_todo_events_listener_should_survive_errors(
+    user, engine, monkeypatch
+):
+    broker = TodoEventBroker([engine.url])
+    monkeypatch.setattr(broker, 'reconnect_delay', 0)
+
+    try:
+        async with broker.subscribe(user.id) as queue:
+            async with engine.connect() as connection:
+                await connection.execute(
+                    text("SELECT pg_notify('todo_events', 'not json')")
+                )
+                await connection.commit()
+            event = await asyncio.wait_for(queue.get(), TIMEOUT)
+    finally:
+        await broker.close()
+
+    assert event == {'event': 'resync', 'ids': None}
+
+
+@pytest.mark.asyncio
+async def test_todo_events_should_not_wait_on_other_shards(
+    session, user, engine, monkeypatch
+):
+    # segundo shard fora do ar: o LISTEN dele nunca fica pronto
+    broker = TodoEventBroker([engine.url, 'postgresql://x@127.0.0.1:1/x'])
+    monkeypatch.setattr(broker, 'ready_timeout', 0.5)
+
+    try:
+        async with broker.subscribe(user.id, 0) as queue:
+            todo = TodoFactory(user_id=user.id)
+            session.add(todo)
+            await session.commit()
+            event = await asyncio.wait_for(queue.get(), TIMEOUT)
+
+        with pytest.raises(TimeoutError):
+            async with broker.subscribe(user.id, 1):
+                pass
+    finally:
+        await broker.close()
+
+    assert event['ids'] == [todo.id]
+    assert not broker._subscribers
+
+
+def test_stream_should_fail_before_the_headers(client, token, monkeypatch):
+    async def wait_ready(shard):
+        raise TimeoutError
+
+    monkeypatch.setattr(todo_events, 'wait_ready', wait_ready)
+
+    response = client.get(
+        '/todos/stream', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_render_sse():
+    event = {'user_id': 1, 'event': 'updated', 'ids': [3]}
+
+    assert render_sse(event) == (
+        'event: updated\n'
+        'data: {"user_id": 1, "event": "updated", "ids": [3]}\n\n'
+    )
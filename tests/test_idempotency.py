@@ -0,0 +1,195 @@
+import asyncio
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+import httpx
+import pytest
+from sqlalchemy import Select, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapizero import idempotency
+from fastapizero.app import app
+from fastapizero.database import get_session
+from fastapizero.idempotency import idempotency_store, request_fingerprint
+from fastapizero.models import IdempotencyKey, Todo, User
+
+NEW_USER = {'username': 'alice', 'email': 'alice@example.com', 'password': 's'}
+
+
+@pytest.fixture
+def store(monkeypatch, engine):
+    monkeypatch.setattr(idempotency_store, 'engine', engine)
+    monkeypatch.setattr(idempotency_store, '_cache', OrderedDict())
+    return idempotency_store
+
+
+@pytest.mark.asyncio
+async def test_create_user_retry_should_replay_response(
+    session, client, store
+):
+    headers = {'Idempotency-Key': 'signup-1'}
+
+    first = client.post('/users/', json=NEW_USER, headers=headers)
+    retry = client.post('/users/', json=NEW_USER, headers=headers)
+
+    assert first.status_code == retry.status_code == HTTPStatus.CREATED
+    assert retry.json() == first.json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert await session.scalar(select(func.count()).select_from(User)) == 1
+
+
+@pytest.mark.asyncio
+async def test_create_todo_retry_should_replay_from_table(
+    session, client, token, store
+):
+    headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': 't-1'}
+    todo = {'title': 'a', 'description': 'b', 'state': 'Draft'}
+
+    first = client.post('/todos/', json=todo, headers=headers)
+    store._cache.clear()  # retry chegando em outro worker
+    retry = client.post('/todos/', json=todo, headers=headers)
+
+    assert retry.json() == first.json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert await session.scalar(select(func.count()).select_from(Todo)) == 1
+
+
+def test_idempotency_key_reuse_with_other_body_should_fail(client, store):
+    headers = {'Idempotency-Key': 'signup-2'}
+    client.post('/users/', json=NEW_USER, headers=headers)
+
+    response = client.post(
+        '/users/', json={**NEW_USER, 'username': 'bob'}, headers=headers
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json() == {
+        'detail': 'Idempotency-Key reused with a different request!'
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_should_wait_for_the_first(session, store):
+    app.dependency_overrides[get_session] = lambda: session
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app), base_url='http://test'
+        ) as client:
+            responses = await asyncio.gather(
+                *(
+                    client.post(
+                        '/users/',
+                        json=NEW_USER,
+                        headers={'Idempotency-Key': 'signup-3'},
+                    )
+                    for _ in range(3)
+                )
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert all(r.status_code == HTTPStatus.CREATED for r in responses)
+    assert len({r.text for r in responses}) == 1
+    replayed = [r for r in responses if 'Idempotent-Replayed' in r.headers]
+    assert len(replayed) == len(responses) - 1
+    assert await session.scalar(select(func.count()).select_from(User)) == 1
+
+
+@pytest.mark.asyncio
+async def test_key_held_by_another_worker_should_conflict(
+    session, client, store, monkeypatch
+):
+    monkeypatch.setattr(store, 'wait_seconds', 0.1)
+    body = json.dumps(NEW_USER).encode()
+    later = datetime.now() + timedelta(days=1)
+    session.add(
+        IdempotencyKey(
+            subject='',
+            key='signup-4',
+            fingerprint=request_fingerprint('POST', '/users/', body),
+            locked_until=later,
+            expires_at=later,
+        )
+    )
+    await session.commit()
+
+    response = client.post(
+        '/users/',
+        content=body,
+        headers={
+            'Content-Type': 'application/json',
+            'Idempotency-Key': 'signup-4',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.headers['Retry-After'] == '1'
+    assert not await session.scalar(select(func.count()).select_from(User))
+
+
+@pytest.mark.asyncio
+async def test_key_released_during_claim_should_claim_again(
+    session, client, store, monkeypatch
+):
+    body = json.dumps(NEW_USER).encode()
+    later = datetime.now() + timedelta(days=1)
+    session.add(
+        IdempotencyKey(
+            subject='',
+            key='signup-5',
+            fingerprint=request_fingerprint('POST', '/users/', body),
+            locked_until=later,
+            expires_at=later,
+        )
+    )
+    await session.commit()
+
+    released = []
+
+    class ReleasingSession(AsyncSession):
+        async def execute(self, statement, *args, **kwargs):
+            # o dono libera a chave entre o upsert e o SELECT
+            if isinstance(statement, Select) and not released:
+                released.append(True)
+                await super().execute(delete(IdempotencyKey))
+                await self.commit()
+            return await super().execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(idempotency, 'AsyncSession', ReleasingSession)
+
+    response = client.post(
+        '/users/',
+        content=body,
+        headers={
+            'Content-Type': 'application/json',
+            'Idempotency-Key': 'signup-5',
+        },
+    )
+
+    assert released
+    assert response.status_code == HTTPStatus.CREATED
+    # a chave foi reivindicada de novo e guarda a resposta para o replay
+    assert (
+        await session.scalar(
+            select(IdempotencyKey.status_code).where(
+                IdempotencyKey.key == 'signup-5'
+            )
+        )
+        == HTTPStatus.CREATED
+    )
+
+
+def test_invalid_token_should_not_share_the_signup_scope(client, store):
+    headers = {'Idempotency-Key': 'shared-1'}
+    client.post('/users/', json=NEW_USER, headers=headers)
+
+    response = client.post(
+        '/todos/',
+        json={'title': 'a', 'description': 'b', 'state': 'Draft'},
+        headers={**headers, 'Authorization': 'Bearer expired'},
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert 'Idempotent-Replayed' not in response.headers
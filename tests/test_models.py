@@ -1,9 +1,11 @@
+import pytest
 from sqlalchemy import select
 
 from fastapizero.models import User
 
 
-def test_create_user(session):
+@pytest.mark.asyncio
+async def test_create_user(session):
     user = User(
         username='xLost',
         email='xlost@email.com',
@@ -11,8 +13,8 @@ def test_create_user(session):
     )
 
     session.add(user)
-    session.commit()
-    result = session.scalar(
+    await session.commit()
+    result = await session.scalar(
         select(User).where(User.email == 'xlost@email.com')
     )
 
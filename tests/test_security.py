@@ -1,9 +1,13 @@
+import time
 from http import HTTPStatus
 
 from jwt import decode
 
 from fastapizero.security import (
+    PrincipalCache,
     create_access_token,
+    hashing_pool,
+    principal_cache,
     settings,
 )
 
@@ -53,3 +57,63 @@ def test_get_current_user_does_not_exists(client):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials!'}
+
+
+def test_hashing_pool_full_should_return_service_unavailable(
+    client, user, monkeypatch
+):
+    monkeypatch.setattr(hashing_pool, 'max_pending', 0)
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
+    assert response.json() == {'detail': 'Server busy, try again later!'}
+
+
+def test_get_current_user_should_use_principal_cache(client, token):
+    for _ in range(3):
+        response = client.post(
+            '/auth/refresh_token',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+
+    assert principal_cache.misses == 1
+    expected_hits = 2
+    assert principal_cache.hits == expected_hits
+
+
+def test_principal_cache_should_expire_after_ttl(user, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    cache = PrincipalCache(ttl=5, max_size=10)
+    cache.set(user.email, user)
+
+    clock[0] = 4.9
+    assert cache.get(user.email) is user
+    clock[0] = 5.0
+    assert cache.get(user.email) is None
+
+
+def test_update_user_should_invalidate_principal_cache(client, user, token):
+    client.post(
+        '/auth/refresh_token',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert principal_cache.get(user.email) is not None
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'newname',
+            'email': 'newname@email.com',
+            'password': 'password',
+        },
+    )
+
+    assert principal_cache.get(user.email) is None
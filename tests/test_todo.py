@@ -1,21 +1,34 @@
+import csv
+import io
+import json
+from datetime import UTC, datetime
 from http import HTTPStatus
 
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapizero import serialization
 from fastapizero.models import Todo, TodoState
+from fastapizero.pagination import decode_cursor, encode_cursor
 from tests.conftest import TodoFactory
 
 
 # test_create_todo
-def test_create_todo(client, token, mock_db_time):
-    with mock_db_time(model=Todo) as time:
-        response = client.post(
-            '/todos/',
-            headers={'Authorization': f'Bearer {token}'},
-            json={
-                'title': 'Test',
-                'description': 'Test',
-                'state': 'Draft',
-            },
-        )
+@pytest.mark.asyncio
+async def test_create_todo(session, client, token):
+    response = client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'title': 'Test',
+            'description': 'Test',
+            'state': 'Draft',
+        },
+    )
+
+    # created_at/updated_at vêm do RETURNING do INSERT
+    todo = await session.scalar(select(Todo).where(Todo.id == 1))
 
     assert response.json() == {
         'id': 1,
@@ -23,18 +36,19 @@ def test_create_todo(client, token, mock_db_time):
         'description': 'Test',
         'state': 'Draft',
         'user_id': 1,
-        'created_at': time.isoformat(),
-        'updated_at': time.isoformat(),
+        'created_at': todo.created_at.isoformat(),
+        'updated_at': todo.updated_at.isoformat(),
     }
 
 
 # test_list_todos
-def test_list_todos_should_return_n_elements(session, client, user, token):
+@pytest.mark.asyncio
+async def test_list_todos_should_return_n_elements(
+    session, client, user, token
+):
     n_elements = 7
-    session.bulk_save_objects(
-        TodoFactory.create_batch(n_elements, user_id=user.id)
-    )
-    session.commit()
+    session.add_all(TodoFactory.create_batch(n_elements, user_id=user.id))
+    await session.commit()
     response = client.get(
         '/todos/',
         headers={'Authorization': f'Bearer {token}'},
@@ -43,7 +57,8 @@ def test_list_todos_should_return_n_elements(session, client, user, token):
     assert len(response.json()['todos']) == n_elements
 
 
-def test_list_todos_pagination_should_return_n_elements(
+@pytest.mark.asyncio
+async def test_list_todos_pagination_should_return_n_elements(
     session, client, user, token
 ):
     # variáveis
@@ -51,8 +66,8 @@ def test_list_todos_pagination_should_return_n_elements(
     n_elements = 2
 
     # building objects
-    session.bulk_save_objects(TodoFactory.create_batch(7, user_id=user.id))
-    session.commit()
+    session.add_all(TodoFactory.create_batch(7, user_id=user.id))
+    await session.commit()
     response = client.get(
         f'/todos/?offset={offset}&limit={n_elements}',
         headers={'Authorization': f'Bearer {token}'},
@@ -60,7 +75,33 @@ def test_list_todos_pagination_should_return_n_elements(
     assert len(response.json()['todos']) == n_elements
 
 
-def test_list_todos_filter_title_should_return_n_elements(
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination_should_walk_all_pages(
+    session, client, user, token
+):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    seen = []
+    cursor = ''
+    while True:
+        response = client.get(
+            f'/todos/?limit=2&cursor={cursor}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        page = response.json()
+        seen.extend(todo['id'] for todo in page['todos'])
+        if not page['next_cursor']:
+            break
+        cursor = page['next_cursor']
+
+    assert seen == sorted(seen)
+    expected_todos = 5
+    assert len(set(seen)) == expected_todos
+
+
+@pytest.mark.asyncio
+async def test_list_todos_filter_title_should_return_n_elements(
     session, client, user, token
 ):
     # variáveis
@@ -68,10 +109,10 @@ def test_list_todos_filter_title_should_return_n_elements(
     title = 'Test Todo'
 
     # building objects
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(n_elements, user_id=user.id, title=title)
     )
-    session.commit()
+    await session.commit()
     response = client.get(
         f'/todos/?title={title}',
         headers={'Authorization': f'Bearer {token}'},
@@ -79,7 +120,8 @@ def test_list_todos_filter_title_should_return_n_elements(
     assert len(response.json()['todos']) == n_elements
 
 
-def test_list_todos_filter_description_should_return_n_elements(
+@pytest.mark.asyncio
+async def test_list_todos_filter_description_should_return_n_elements(
     session, client, user, token
 ):
     # variáveis
@@ -87,10 +129,10 @@ def test_list_todos_filter_description_should_return_n_elements(
     desc = 'description test'
 
     # building objects
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(n_elements, user_id=user.id, description=desc)
     )
-    session.commit()
+    await session.commit()
     response = client.get(
         '/todos/?description=desc',
         headers={'Authorization': f'Bearer {token}'},
@@ -98,7 +140,8 @@ def test_list_todos_filter_description_should_return_n_elements(
     assert len(response.json()['todos']) == n_elements
 
 
-def test_list_todos_filter_state_should_return_n_elements(
+@pytest.mark.asyncio
+async def test_list_todos_filter_state_should_return_n_elements(
     session, client, user, token
 ):
     # variáveis
@@ -106,10 +149,10 @@ def test_list_todos_filter_state_should_return_n_elements(
     state = TodoState.draft
 
     # building objects
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(n_elements, user_id=user.id, state=state)
     )
-    session.commit()
+    await session.commit()
     response = client.get(
         '/todos/?state=draft',
         headers={'Authorization': f'Bearer {token}'},
@@ -117,11 +160,12 @@ def test_list_todos_filter_state_should_return_n_elements(
     assert len(response.json()['todos']) == n_elements
 
 
-def test_list_todos_filter_combined_should_return_5_todos(
+@pytest.mark.asyncio
+async def test_list_todos_filter_combined_should_return_5_todos(
     session, user, client, token
 ):
     expected_todos = 5
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             5,
             user_id=user.id,
@@ -131,7 +175,7 @@ def test_list_todos_filter_combined_should_return_5_todos(
         )
     )
 
-    session.bulk_save_objects(
+    session.add_all(
         TodoFactory.create_batch(
             3,
             user_id=user.id,
@@ -140,7 +184,7 @@ def test_list_todos_filter_combined_should_return_5_todos(
             state=TodoState.todo,
         )
     )
-    session.commit()
+    await session.commit()
 
     response = client.get(
         '/todos/?title=Test combined&description=combined&state=done',
@@ -150,11 +194,76 @@ def test_list_todos_filter_combined_should_return_5_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+@pytest.mark.asyncio
+async def test_list_todos_search_should_match_title_or_description(
+    session, client, user, token
+):
+    session.add_all([
+        TodoFactory(user_id=user.id, title='comprar pão', description='x'),
+        TodoFactory(user_id=user.id, title='x', description='pão de queijo'),
+        TodoFactory(user_id=user.id, title='lavar', description='louça'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=pão',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    expected_todos = 2
+    assert len(response.json()['todos']) == expected_todos
+    assert response.json()['next_cursor'] is None
+
+
+def test_list_todos_search_with_cursor_should_return_bad_request(
+    client, token
+):
+    response = client.get(
+        '/todos/?q=pão&cursor=abc',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {
+        'detail': 'Cursor pagination is not available with q!'
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_todos_fields_should_return_only_selected_columns(
+    session, client, user, token
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/?fields=id,title,state,&limit=2',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    page = response.json()
+
+    assert response.status_code == HTTPStatus.OK
+    assert all(set(todo) == {'id', 'title', 'state'} for todo in page['todos'])
+    # o cursor continua disponível sem created_at no fields
+    assert page['next_cursor']
+
+
+def test_list_todos_unknown_fields_should_return_bad_request(client, token):
+    response = client.get(
+        '/todos/?fields=title,password',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Unknown fields: password'}
+
+
 # test_delete_todo
-def test_delete_todo(session, client, user, token):
+@pytest.mark.asyncio
+async def test_delete_todo(session, client, user, token):
     todo = TodoFactory(user_id=user.id)
     session.add(todo)
-    session.commit()
+    await session.commit()
 
     response = client.delete(
         f'/todos/{todo.id}',
@@ -186,12 +295,13 @@ def test_patch_todo_should_return_not_found(client, token):
     assert response.json() == {'detail': 'Task not found!'}
 
 
-def test_patch_todo(client, session, token, user):
+@pytest.mark.asyncio
+async def test_patch_todo(client, session, token, user):
     todo = TodoFactory(user_id=user.id)
 
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await session.commit()
+    await session.refresh(todo)
 
     response = client.patch(
         f'/todos/{todo.id}',
@@ -204,15 +314,16 @@ def test_patch_todo(client, session, token, user):
 
 
 # teste exercício todos atributos OK
-def test_list_todos_should_return_all_expected_fields(
+@pytest.mark.asyncio
+async def test_list_todos_should_return_all_expected_fields(
     session, client, user, token, mock_db_time
 ):
     with mock_db_time(model=Todo) as time:
         todo = TodoFactory(user_id=user.id)
         session.add(todo)
-        session.commit()
+        await session.commit()
 
-    session.refresh(todo)
+    await session.refresh(todo)
     response = client.get(
         '/todos/',
         headers={'Authorization': f'Bearer {token}'},
@@ -229,3 +340,507 @@ def test_list_todos_should_return_all_expected_fields(
             'updated_at': time.isoformat(),
         }
     ]
+
+
+@pytest.mark.asyncio
+async def test_patch_todo_of_other_user_should_return_not_found(
+    session, client, other_user, token
+):
+    todo = TodoFactory(user_id=other_user.id)
+    session.add(todo)
+    await session.commit()
+
+    response = client.patch(
+        f'/todos/{todo.id}',
+        json={'title': 'hijack'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'Task not found!'}
+
+
+# test_bulk
+def test_create_todos_bulk(client, user, token):
+    payload = [
+        {'title': f'todo {i}', 'description': 'bulk', 'state': 'Todo'}
+        for i in range(3)
+    ]
+
+    response = client.post(
+        '/todos/bulk',
+        json=payload,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        'todo 0',
+        'todo 1',
+        'todo 2',
+    ]
+    assert {todo['user_id'] for todo in response.json()['todos']} == {user.id}
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_bulk(session, client, user, other_user, token):
+    mine = TodoFactory(user_id=user.id, state=TodoState.todo)
+    theirs = TodoFactory(user_id=other_user.id)
+    session.add_all([mine, theirs])
+    await session.commit()
+
+    response = client.patch(
+        '/todos/bulk',
+        json=[
+            {'id': mine.id, 'state': 'Done'},
+            {'id': theirs.id, 'title': 'hijack'},
+        ],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    results = response.json()['results']
+    assert response.status_code == HTTPStatus.OK
+    assert results[0]['status'] == 'updated'
+    assert results[0]['todo']['state'] == 'Done'
+    assert results[0]['todo']['title'] == mine.title
+    assert results[1] == {'id': theirs.id, 'status': 'not_found', 'todo': None}
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_bulk(session, client, user, token):
+    todos = TodoFactory.create_batch(2, user_id=user.id)
+    session.add_all(todos)
+    await session.commit()
+
+    response = client.request(
+        'DELETE',
+        '/todos/bulk',
+        json=[todos[0].id, todos[1].id, 666],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [r['status'] for r in response.json()['results']] == [
+        'deleted',
+        'deleted',
+        'not_found',
+    ]
+
+
+def test_create_todos_bulk_empty_should_return_unprocessable(client, token):
+    response = client.post(
+        '/todos/bulk',
+        json=[],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+# test_export
+@pytest.mark.asyncio
+async def test_export_todos_ndjson(session, client, user, other_user, token):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    session.add_all(TodoFactory.create_batch(2, user_id=other_user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=ndjson',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    expected_rows = 3
+    assert len(rows) == expected_rows
+    assert {row['user_id'] for row in rows} == {user.id}
+
+
+@pytest.mark.asyncio
+async def test_export_todos_csv_should_apply_filters(
+    session, client, user, token
+):
+    session.add_all(
+        TodoFactory.create_batch(2, user_id=user.id, state=TodoState.done)
+    )
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+    )
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv&state=done',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert response.headers['content-type'].startswith('text/csv')
+    assert [row['state'] for row in rows] == ['Done', 'Done']
+
+
+# test_import
+@pytest.mark.asyncio
+async def test_import_todos_csv(session, client, user, token):
+    body = (
+        'title,description,state\n'
+        'first,plain,Todo\n'
+        'second,"multi\nline, quoted",Done\n'
+        'broken,row,Nope\n'
+    )
+
+    response = client.post(
+        '/todos/import?format=csv',
+        content=body,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    summary = response.json()
+    expected_imported = 2
+    assert response.status_code == HTTPStatus.OK
+    assert summary['imported'] == expected_imported
+    assert summary['rejected'] == 1
+    broken_line = 5
+    assert summary['chunks'][0]['errors'][0]['line'] == broken_line
+
+    todos = (await session.scalars(select(Todo).order_by(Todo.id))).all()
+    assert [todo.description for todo in todos] == [
+        'plain',
+        'multi\nline, quoted',
+    ]
+    assert {todo.user_id for todo in todos} == {user.id}
+
+
+def test_import_todos_ndjson(client, token):
+    lines = [
+        json.dumps({'title': 'a', 'description': 'b', 'state': 'Draft'}),
+        '',
+        '{not json',
+    ]
+
+    response = client.post(
+        '/todos/import',
+        content='\n'.join(lines),
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    summary = response.json()
+    assert summary['imported'] == 1
+    assert summary['rejected'] == 1
+    broken_line = 3
+    assert summary['chunks'][0]['errors'][0]['line'] == broken_line
+
+
+def test_import_todos_csv_should_reject_malformed_records(client, token):
+    body = (
+        'title,description,state\nbad,x"y,Todo\nalso,y"z,Todo\nok,fine,Done\n'
+    )
+
+    response = client.post(
+        '/todos/import?format=csv',
+        content=body,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    summary = response.json()
+    assert response.status_code == HTTPStatus.OK
+    assert summary['imported'] == 1
+    assert summary['chunks'][0]['errors'] == [
+        {'line': 2, 'error': 'Malformed CSV record'}
+    ]
+
+
+def test_import_todos_should_reject_oversized_records(
+    client, token, monkeypatch
+):
+    monkeypatch.setattr('fastapizero.routers.todo.IMPORT_MAX_RECORD_SIZE', 64)
+    lines = [
+        json.dumps({'title': 'x' * 100, 'description': 'b', 'state': 'Todo'}),
+        json.dumps({'title': 'a', 'description': 'b', 'state': 'Todo'}),
+    ]
+
+    response = client.post(
+        '/todos/import',
+        content='\n'.join(lines),
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    summary = response.json()
+    assert summary['imported'] == 1
+    assert summary['chunks'][0]['errors'] == [
+        {'line': 1, 'error': 'Record exceeds 64 bytes'}
+    ]
+
+
+def test_import_todos_csv_should_not_buffer_unbalanced_quotes(
+    client, token, monkeypatch
+):
+    monkeypatch.setattr('fastapizero.routers.todo.IMPORT_MAX_RECORD_SIZE', 64)
+    body = 'title,description,state\nopen,"never closed,Todo\n' + (
+        'row,desc,Todo\n' * 10
+    )
+
+    response = client.post(
+        '/todos/import?format=csv',
+        content=body,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    summary = response.json()
+    assert response.status_code == HTTPStatus.OK
+    assert summary['imported'] > 0
+    assert summary['chunks'][0]['errors'][0] == {
+        'line': 2,
+        'error': 'Record exceeds 64 bytes',
+    }
+
+
+def test_import_todos_csv_invalid_header(client, token, monkeypatch):
+    monkeypatch.setattr('fastapizero.routers.todo.IMPORT_MAX_RECORD_SIZE', 64)
+
+    response = client.post(
+        '/todos/import?format=csv',
+        content='title,' * 20 + '\nrow,desc,Todo\n',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid CSV header!'}
+
+
+# test_changes
+@pytest.mark.asyncio
+async def test_list_todo_changes_should_return_updates_and_tombstones(
+    session, client, user, token
+):
+    kept, removed = TodoFactory.create_batch(2, user_id=user.id)
+    session.add_all([kept, removed])
+    await session.commit()
+
+    first_sync = client.get(
+        '/todos/changes',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+    expected_todos = 2
+    assert len(first_sync['todos']) == expected_todos
+    assert first_sync['deleted'] == []
+
+    client.patch(
+        f'/todos/{kept.id}',
+        json={'title': 'changed'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    client.delete(
+        f'/todos/{removed.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    response = client.get(
+        '/todos/changes',
+        params={'since': first_sync['watermark']},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    changes = response.json()
+    assert [todo['title'] for todo in changes['todos']] == ['changed']
+    assert changes['deleted'] == [removed.id]
+
+    response = client.get(
+        '/todos/changes',
+        params={'since': changes['watermark']},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['todos'] == []
+    assert response.json()['deleted'] == []
+
+
+def test_list_todo_changes_without_changes(client, token):
+    first_sync = client.get(
+        '/todos/changes',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+
+    response = client.get(
+        '/todos/changes',
+        params={'since': first_sync['watermark']},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    changes = response.json()
+    assert changes['todos'] == []
+    assert changes['deleted'] == []
+    assert decode_cursor(changes['watermark'], int, str)[0] == 0
+
+
+@pytest.mark.asyncio
+async def test_list_todo_changes_should_not_skip_late_commits(
+    session, client, user, token, engine
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    # transação que começa antes do sync e só escreve e commita depois dele
+    async with AsyncSession(engine) as late:
+        await late.execute(select(func.now()))
+        await session.commit()
+        client.post(
+            '/todos/',
+            json={'title': 'early', 'description': 'd', 'state': 'Todo'},
+            headers=headers,
+        )
+        first_sync = client.get('/todos/changes', headers=headers).json()
+
+        late.add(TodoFactory(user_id=user.id, title='late'))
+        await late.commit()
+
+    response = client.get(
+        '/todos/changes',
+        params={'since': first_sync['watermark']},
+        headers=headers,
+    )
+
+    assert [todo['title'] for todo in first_sync['todos']] == ['early']
+    assert [todo['title'] for todo in response.json()['todos']] == ['late']
+
+
+def test_list_todo_changes_expired_watermark(client, token):
+    watermark = encode_cursor(1, datetime(2000, 1, 1, tzinfo=UTC))
+
+    response = client.get(
+        '/todos/changes',
+        params={'since': watermark},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.GONE
+    assert response.json() == {
+        'detail': 'Watermark expired, sync from scratch!'
+    }
+
+
+def test_list_todo_changes_naive_watermark(client, token):
+    watermark = encode_cursor(1, datetime(2000, 1, 1))
+
+    response = client.get(
+        '/todos/changes',
+        params={'since': watermark},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor!'}
+
+
+@pytest.mark.asyncio
+async def test_list_todo_changes_should_page_the_first_sync(
+    session, client, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    first_page = client.get(
+        '/todos/changes', params={'limit': 2}, headers=headers
+    ).json()
+    # escrita no meio da paginação fica para o próximo since
+    client.post(
+        '/todos/',
+        json={'title': 'late', 'description': 'd', 'state': 'Todo'},
+        headers=headers,
+    )
+    last_page = client.get(
+        '/todos/changes',
+        params={'limit': 2, 'cursor': first_page['next_cursor']},
+        headers=headers,
+    ).json()
+    changes = client.get(
+        '/todos/changes',
+        params={'since': last_page['watermark']},
+        headers=headers,
+    ).json()
+
+    expected_first_page = 2
+    assert len(first_page['todos']) == expected_first_page
+    assert len(last_page['todos']) == 1
+    assert last_page['next_cursor'] is None
+    assert last_page['watermark'] == first_page['watermark']
+    assert 'version' not in last_page['todos'][0]
+    assert [todo['title'] for todo in changes['todos']] == ['late']
+
+
+@pytest.mark.asyncio
+async def test_todo_stats_should_follow_writes(session, client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    draft, done = (
+        TodoFactory.create(user_id=user.id, state=TodoState.draft),
+        TodoFactory.create(user_id=user.id, state=TodoState.done),
+    )
+    session.add_all([draft, done])
+    await session.commit()
+
+    client.patch(
+        f'/todos/{draft.id}', json={'state': 'Doing'}, headers=headers
+    )
+    client.delete(f'/todos/{done.id}', headers=headers)
+    client.post(
+        '/todos/bulk',
+        json=[{'title': 't', 'description': 'd', 'state': 'Todo'}] * 2,
+        headers=headers,
+    )
+
+    response = client.get('/todos/stats', headers=headers)
+
+    assert response.json() == {
+        'states': {'Draft': 0, 'Todo': 2, 'Doing': 1, 'Done': 0, 'Trash': 0},
+        'total': 3,
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_todos_conditional_get(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get('/todos/?limit=1', headers=headers)
+    etag = response.headers['ETag']
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'Last-Modified' in response.headers
+
+    response = client.get(
+        '/todos/?limit=1', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+
+    # outra query string gera outra representação
+    response = client.get(
+        '/todos/?limit=2', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+    client.request('DELETE', '/todos/1', headers=headers)
+    response = client.get(
+        '/todos/?limit=1', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.asyncio
+async def test_list_todos_fast_json_should_match_default_path(
+    session, client, user, token, monkeypatch
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    default = client.get('/todos/?limit=2', headers=headers)
+    monkeypatch.setattr(serialization.settings, 'FAST_JSON', True)
+    fast = client.get('/todos/?limit=2', headers=headers)
+
+    assert fast.json() == default.json()
+    assert fast.headers['ETag'] == default.headers['ETag']
+    assert fast.headers['content-type'] == 'application/json'
@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy import update
+
+from fastapizero.database import ShardMap
+from fastapizero.models import TodoState, TodoStateCount
+from fastapizero.todo_stats import reconcile
+from tests.conftest import TodoFactory
+
+
+@pytest.mark.asyncio
+async def test_reconcile_should_repair_drifted_counts(session, engine, user):
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+    )
+    await session.commit()
+    await session.execute(
+        update(TodoStateCount)
+        .where(TodoStateCount.user_id == user.id)
+        .values(count=10)
+    )
+    await session.commit()
+
+    repaired = await reconcile(ShardMap([engine]))
+
+    assert repaired == {user.id: {TodoState.todo: -7}}
+    assert await reconcile(ShardMap([engine])) == {}
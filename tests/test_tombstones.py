@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from fastapizero.database import ShardMap
+from fastapizero.models import TodoDeletion
+from fastapizero.tombstones import prune
+
+
+@pytest.mark.asyncio
+async def test_prune_should_only_delete_expired_tombstones(
+    session, engine, user
+):
+    session.add_all([
+        TodoDeletion(todo_id=1, user_id=user.id),
+        TodoDeletion(todo_id=2, user_id=user.id),
+    ])
+    await session.commit()
+    await session.execute(
+        update(TodoDeletion)
+        .where(TodoDeletion.todo_id == 1)
+        .values(deleted_at=datetime(2000, 1, 1))
+    )
+    await session.commit()
+
+    pruned = await prune(ShardMap([engine]), timedelta(days=30))
+
+    assert pruned == 1
+    assert list(await session.scalars(select(TodoDeletion.todo_id))) == [2]
@@ -1,6 +1,12 @@
 from http import HTTPStatus
 
+import pytest
+from sqlalchemy import func, select
+
+from fastapizero.models import Todo, User
 from fastapizero.schemas import UserPublic
+from fastapizero.security import hashing_pool
+from tests.conftest import TodoFactory
 
 
 def test_create_user(client):
@@ -25,13 +31,13 @@ def test_read_users(client):
     response = client.get('/users/')
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': []}
+    assert response.json() == {'users': [], 'next_cursor': None}
 
 
 def test_read_users_with_user(client, user):
     user_schema = UserPublic.model_validate(user).model_dump()
     response = client.get('/users/')
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
 
 
 def test_read_user(client, user):
@@ -64,6 +70,50 @@ def test_create_user_should_return_400_if_username_exists(client, user):
     assert response.json() == {'detail': 'Username already exists!'}
 
 
+def test_create_user_duplicate_should_not_hash_password(
+    client, user, monkeypatch
+):
+    async def fail_hash(password):
+        raise AssertionError('hashed a duplicate signup')
+
+    monkeypatch.setattr(hashing_pool, 'hash', fail_hash)
+
+    response = client.post(
+        '/users/',
+        json={
+            'username': 'other',
+            'email': user.email,
+            'password': 'password',
+        },
+    )
+
+    assert response.json() == {'detail': 'Email already exists!'}
+
+
+@pytest.mark.asyncio
+async def test_create_user_should_undo_signup_if_mirror_fails(
+    session, client, monkeypatch
+):
+    async def fail_mirror(shard, statement):
+        raise ConnectionError('shard down')
+
+    monkeypatch.setattr(
+        'fastapizero.routers.users.execute_on_shard', fail_mirror
+    )
+
+    with pytest.raises(ConnectionError):
+        client.post(
+            '/users/',
+            json={
+                'username': 'usertest',
+                'password': 'password',
+                'email': 'user@test.com',
+            },
+        )
+
+    assert not await session.scalar(select(func.count()).select_from(User))
+
+
 def test_create_user_should_return_400_if_email_exists(client, user):
     response = client.post(
         '/users/',
@@ -126,3 +176,81 @@ def test_delete_user_should_return_forbidden(client, other_user, token):
     )
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permission!'}
+
+
+def test_read_users_cursor_pagination(client, user, other_user):
+    response = client.get('/users/?limit=1')
+    first_page = response.json()
+
+    assert [u['id'] for u in first_page['users']] == [user.id]
+
+    response = client.get(
+        f'/users/?limit=1&cursor={first_page["next_cursor"]}'
+    )
+
+    assert [u['id'] for u in response.json()['users']] == [other_user.id]
+
+
+def test_read_users_invalid_cursor(client):
+    response = client.get('/users/?cursor=not-a-cursor')
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor!'}
+
+
+def test_update_user_should_change_stored_user(client, user, token):
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'renamed',
+            'email': 'renamed@email.com',
+            'password': 'password',
+        },
+    )
+
+    response = client.get(f'/users/{user.id}')
+
+    assert response.json() == {
+        'username': 'renamed',
+        'email': 'renamed@email.com',
+        'id': user.id,
+    }
+
+
+@pytest.mark.asyncio
+async def test_delete_user_should_cascade_todos(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    response = client.delete(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert await session.scalar(select(func.count()).select_from(Todo)) == 0
+
+
+def test_read_user_conditional_get(client, user, token):
+    response = client.get(f'/users/{user.id}')
+    etag = response.headers['ETag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not response.content
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'renamed',
+            'email': 'renamed@email.com',
+            'password': 'password',
+        },
+    )
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag